@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.general.utils.metrics import metrics
+from app.general.utils.verification import verify_basic_auth
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["system"])
+async def get_metrics(auth: bool = Depends(verify_basic_auth)):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
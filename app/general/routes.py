@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from app.general.api.docs import router as docs_router
+from app.general.api.metrics import router as metrics_router
 from app.general.api.root import router as root_router
 
 
@@ -8,3 +9,4 @@ router = APIRouter()
 
 router.include_router(root_router)
 router.include_router(docs_router)
+router.include_router(metrics_router)
@@ -12,7 +12,39 @@ class Config:
     client_id: str
     client_secret: str
     file_gcp_sheets_key: str
-
+    users_cache_max_size: int
+    users_cache_sweep_interval: int
+    http_timeout: float
+    http_connect_timeout: float
+    http_max_connections: int
+    http_max_keepalive_connections: int
+    yandex_userinfo_url: str
+    yandex_token_url: str
+    negative_cache_ttl: float
+    negative_cache_max_size: int
+    sheets_batch_size: int
+    sheets_flush_interval: float
+    sheets_queue_max_size: int
+    sheets_cache_ttl: float
+    device_send_timeout: float
+    device_outbox_size: int
+    device_router: str
+    device_router_dir: str
+    redis_url: str
+    state_store_path: str
+    state_store_flush_interval: float
+    log_level: str
+    log_format: str
+    log_device_debug_interval: float
+    heartbeat_interval: float
+    heartbeat_timeout: float
+    yandex_skill_id: str
+    yandex_skill_token: str
+    yandex_callback_url: str
+    notify_debounce: float
+    notify_max_delay: float
+    notify_retries: int
+    notify_backoff: float
 
 
 def load_config(path: str | None = None) -> Config:
@@ -26,7 +58,40 @@ def load_config(path: str | None = None) -> Config:
         api_key=env("API_KEY"),
         client_id=env("CLIENT_ID"),
         client_secret=env("CLIENT_SECRET"),
-        file_gcp_sheets_key=env("FILE_GCP_SHEETS_KEY")
+        file_gcp_sheets_key=env("FILE_GCP_SHEETS_KEY"),
+        users_cache_max_size=env.int("USERS_CACHE_MAX_SIZE", 10000),
+        users_cache_sweep_interval=env.int("USERS_CACHE_SWEEP_INTERVAL", 60),
+        http_timeout=env.float("HTTP_TIMEOUT", 10.0),
+        http_connect_timeout=env.float("HTTP_CONNECT_TIMEOUT", 5.0),
+        http_max_connections=env.int("HTTP_MAX_CONNECTIONS", 100),
+        http_max_keepalive_connections=env.int("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20),
+        yandex_userinfo_url=env("YANDEX_USERINFO_URL", "https://login.yandex.ru/info"),
+        yandex_token_url=env("YANDEX_TOKEN_URL", "https://oauth.yandex.ru/token"),
+        negative_cache_ttl=env.float("NEGATIVE_CACHE_TTL", 30.0),
+        negative_cache_max_size=env.int("NEGATIVE_CACHE_MAX_SIZE", 10000),
+        sheets_batch_size=env.int("SHEETS_BATCH_SIZE", 50),
+        sheets_flush_interval=env.float("SHEETS_FLUSH_INTERVAL", 1.0),
+        sheets_queue_max_size=env.int("SHEETS_QUEUE_MAX_SIZE", 10000),
+        sheets_cache_ttl=env.float("SHEETS_CACHE_TTL", 300.0),
+        device_send_timeout=env.float("DEVICE_SEND_TIMEOUT", 5.0),
+        device_outbox_size=env.int("DEVICE_OUTBOX_SIZE", 16),
+        device_router=env("DEVICE_ROUTER", "local"),
+        device_router_dir=env("DEVICE_ROUTER_DIR", "/tmp/smartstrip"),
+        redis_url=env("REDIS_URL", "redis://localhost:6379/0"),
+        state_store_path=env("STATE_STORE_PATH", "./data/state.db"),
+        state_store_flush_interval=env.float("STATE_STORE_FLUSH_INTERVAL", 1.0),
+        log_level=env("LOG_LEVEL", "DEBUG").upper(),
+        log_format=env("LOG_FORMAT", "text"),
+        log_device_debug_interval=env.float("LOG_DEVICE_DEBUG_INTERVAL", 1.0),
+        heartbeat_interval=env.float("HEARTBEAT_INTERVAL", 15.0),
+        heartbeat_timeout=env.float("HEARTBEAT_TIMEOUT", 45.0),
+        yandex_skill_id=env("YANDEX_SKILL_ID", ""),
+        yandex_skill_token=env("YANDEX_SKILL_TOKEN", ""),
+        yandex_callback_url=env("YANDEX_CALLBACK_URL", "https://dialogs.yandex.net/api/v1/skills/{skill_id}/callback/state"),
+        notify_debounce=env.float("NOTIFY_DEBOUNCE", 0.5),
+        notify_max_delay=env.float("NOTIFY_MAX_DELAY", 2.0),
+        notify_retries=env.int("NOTIFY_RETRIES", 3),
+        notify_backoff=env.float("NOTIFY_BACKOFF", 0.5)
     )
 
 
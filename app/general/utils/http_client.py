@@ -0,0 +1,47 @@
+import httpx
+
+from app.general.utils.config import app_config
+from app.general.utils.logger import logger
+
+
+# HTTP/2 доступен только при установленном пакете h2
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HttpClient:
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Клиент создается лениво, если startup-хук еще не отработал
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    @staticmethod
+    def _create_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(app_config.http_timeout, connect=app_config.http_connect_timeout),
+            limits=httpx.Limits(
+                max_connections=app_config.http_max_connections,
+                max_keepalive_connections=app_config.http_max_keepalive_connections
+            )
+        )
+
+    async def start(self):
+        _ = self.client
+        logger.debug("HTTP client started (http2=%s)", HTTP2_AVAILABLE)
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+http_client = HttpClient()
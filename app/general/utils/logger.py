@@ -1,19 +1,89 @@
+import atexit
+import json
 import logging
+import time
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 
+from app.general.utils.config import app_config
 
-def setup_logger(name: str = "SmartStrip", level: int = logging.DEBUG) -> logging.Logger:
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+# Запись в поток вывода идет в отдельном потоке, в вызывающем коде запись только кладется в очередь
+def setup_logger(name: str = "SmartStrip", level: str = app_config.log_level,
+                 fmt: str = app_config.log_format) -> logging.Logger:
     new_logger = logging.getLogger(name)
     new_logger.setLevel(level)
 
-    if not new_logger.hasHandlers():
+    if not new_logger.handlers:
         ch = logging.StreamHandler()
-        ch.setLevel(level)
+        ch.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
 
-        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-        ch.setFormatter(formatter)
-        new_logger.addHandler(ch)
+        log_queue = SimpleQueue()
+        listener = QueueListener(log_queue, ch, respect_handler_level=True)
+        listener.start()
+        # Дописываем очередь при выходе из процесса
+        atexit.register(listener.stop)
+
+        new_logger.addHandler(QueueHandler(log_queue))
 
     return new_logger
 
 
+# Не больше одного сообщения на устройство за interval секунд, остальные только считаем
+class DeviceLogLimiter:
+    def __init__(self, interval: float = app_config.log_device_debug_interval):
+        self.interval = interval
+        # device_id -> (начало окна, пропущено сообщений)
+        self._windows: dict[str, tuple[float, int]] = dict()
+
+    # Возвращает число пропущенных с прошлого раза сообщений или None, если сообщение надо пропустить
+    def allow(self, device_id: str) -> int | None:
+        if self.interval <= 0:
+            return 0
+
+        now = time.monotonic()
+        window = self._windows.get(device_id)
+
+        if window is None or now - window[0] >= self.interval:
+            self._windows[device_id] = (now, 0)
+            return window[1] if window else 0
+
+        self._windows[device_id] = (window[0], window[1] + 1)
+        return None
+
+    def forget(self, device_id: str):
+        self._windows.pop(device_id, None)
+
+
 logger = setup_logger()
+device_log_limiter = DeviceLogLimiter()
+
+
+# Отладочные сообщения о конкретной ленте: при выключенном DEBUG ничего не форматируется
+def log_device_debug(device_id: str, msg: str, *args):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
+    suppressed = device_log_limiter.allow(device_id)
+    if suppressed is None:
+        return
+
+    if suppressed:
+        logger.debug(msg + " (%d similar messages suppressed)", *args, suppressed)
+    else:
+        logger.debug(msg, *args)
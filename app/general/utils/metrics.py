@@ -0,0 +1,173 @@
+import time
+from bisect import bisect_left
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge(Counter):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+# Счетчики по корзинам выделяются один раз при создании, observe ничего не аллоцирует
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    def __init__(self, name: str, documentation: str, kind: str,
+                 labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+                 fn: Callable[[], float] | None = None):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Значение, которое считается только в момент запроса метрик
+        self.fn = fn
+        self._children: dict[tuple[str, ...], Counter | Gauge | Histogram] = dict()
+
+    def _create(self) -> Counter | Gauge | Histogram:
+        if self.kind == "histogram":
+            return Histogram(self.buckets)
+        if self.kind == "gauge":
+            return Gauge()
+        return Counter()
+
+    # Дочернюю метрику стоит получить один раз и держать ссылку на нее на горячем пути
+    def labels(self, *values: str) -> Counter | Gauge | Histogram:
+        child = self._children.get(values)
+
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+
+            child = self._children[values] = self._create()
+        return child
+
+    def remove(self, *values: str):
+        self._children.pop(values, None)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+        if self.fn is not None:
+            lines.append(f"{self.name} {_format_value(self.fn())}")
+            return lines
+
+        for values, child in list(self._children.items()):
+            if isinstance(child, Histogram):
+                cumulative = 0
+                for bound, count in zip((*child.buckets, float("inf")), child.counts):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+                labels = _format_labels(self.labelnames, values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+                lines.append(f"{self.name}_count{labels} {child.count}")
+            else:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = dict()
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                fn: Callable[[], float] | None = None) -> Metric:
+        return self._register(Metric(name, documentation, "counter", labelnames, fn=fn))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+              fn: Callable[[], float] | None = None) -> Metric:
+        return self._register(Metric(name, documentation, "gauge", labelnames, fn=fn))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Metric:
+        return self._register(Metric(name, documentation, "histogram", labelnames, buckets=buckets))
+
+    # Текстовый формат Prometheus 0.0.4
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "smartstrip_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+
+
+# ASGI-мидлварь: на запрос только отметка времени, метрика маршрута создается один раз
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Шаблон пути, а не сам путь: иначе каждый id устройства станет отдельной серией
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], path).observe(time.perf_counter() - started)
@@ -0,0 +1,62 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+class NegativeCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        # хеш токена -> момент истечения записи (time.monotonic)
+        self._entries: OrderedDict[bytes, float] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Храним только хеши, чтобы отклоненные токены не лежали в памяти в открытом виде
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def add(self, token: str):
+        key = self._key(token)
+        self._entries[key] = time.monotonic() + self.ttl
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def contains(self, token: str) -> bool:
+        key = self._key(token)
+        expires_at = self._entries.get(key)
+
+        if expires_at is None:
+            self.misses += 1
+            return False
+
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        return True
+
+    def discard(self, token: str):
+        self._entries.pop(self._key(token), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -2,16 +2,44 @@ from fastapi import WebSocket, Depends, HTTPException, status
 from fastapi import Header
 from fastapi.security import  HTTPBasic, HTTPBasicCredentials, OAuth2AuthorizationCodeBearer
 import secrets
+import time
+
 import httpx
 
-from app.pkg_smart_strip.models.User import User
+from app.pkg_smart_strip.models.User import User, YANDEX_REQUEST_SECONDS
 from app.pkg_smart_strip.models.UserRegistry import users_cache
 from app.general.utils.config import app_config
+from app.general.utils.http_client import http_client
+from app.general.utils.logger import logger
+from app.general.utils.metrics import metrics
+from app.general.utils.negative_cache import NegativeCache
+from app.general.utils.single_flight import SingleFlight
 
 
 AUTHORIZATION_URL = "https://maxsfamily.ru/oauth/authorize"
 TOKEN_URL = "https://maxsfamily.ru/oauth/token"
-YANDEX_USERINFO_URL = "https://login.yandex.ru/info"
+YANDEX_USERINFO_URL = app_config.yandex_userinfo_url
+
+# Ответы 4xx, которые говорят о перегрузке или таймауте, а не о плохом токене
+TRANSIENT_CLIENT_ERRORS = frozenset({status.HTTP_408_REQUEST_TIMEOUT, status.HTTP_429_TOO_MANY_REQUESTS})
+
+userinfo_requests = SingleFlight()
+refresh_requests = SingleFlight()
+rejected_tokens = NegativeCache(ttl=app_config.negative_cache_ttl, max_size=app_config.negative_cache_max_size)
+
+TOKEN_CACHE_LOOKUPS = metrics.counter(
+    "smartstrip_token_cache_lookups_total", "Token cache lookups by result", ("result",)
+)
+TOKEN_CACHE_HITS = TOKEN_CACHE_LOOKUPS.labels("hit")
+TOKEN_CACHE_MISSES = TOKEN_CACHE_LOOKUPS.labels("miss")
+USERINFO_REQUEST_SECONDS = YANDEX_REQUEST_SECONDS.labels("userinfo")
+
+metrics.counter("smartstrip_rejected_tokens_hits_total", "Requests answered from the rejected tokens cache",
+                fn=lambda: rejected_tokens.hits)
+metrics.counter("smartstrip_rejected_tokens_evictions_total", "Tokens evicted from the full rejected tokens cache",
+                fn=lambda: rejected_tokens.evictions)
+metrics.gauge("smartstrip_rejected_tokens", "Tokens in the rejected tokens cache",
+              fn=lambda: len(rejected_tokens))
 
 security = HTTPBasic()
 oauth2_scheme = OAuth2AuthorizationCodeBearer(
@@ -53,6 +81,48 @@ async def verify_websocket(websocket: WebSocket) -> bool:
     return True
 
 
+# Обновление токена пользователя, одно на всех одновременных запросах
+async def _refresh_user(user: User) -> bool:
+    try:
+        refreshed = await user.refresh(app_config.client_id, app_config.client_secret)
+    except (ValueError, httpx.HTTPError) as e:
+        # Без refresh_token или без ответа Яндекса обновить нельзя: токен перепроверяется через userinfo
+        logger.debug("Cannot refresh token of %s: %r", user.user_id, e)
+        return False
+
+    if refreshed:
+        # После обновления токен изменился — переиндексируем пользователя
+        users_cache.add_user(user)
+    return refreshed
+
+
+# Запрос данных пользователя в Яндексе, один на всех одновременных запросах с этим токеном
+async def _fetch_user(token: str) -> User | None:
+    started = time.perf_counter()
+    resp = await http_client.client.get(
+        YANDEX_USERINFO_URL,
+        headers={"Authorization": f"OAuth {token}"}
+    )
+    USERINFO_REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+    if resp.status_code != status.HTTP_200_OK:
+        # Кешируем только явный отказ Яндекса, а не его временные ошибки
+        if resp.is_client_error and resp.status_code not in TRANSIENT_CLIENT_ERRORS:
+            rejected_tokens.add(token)
+        return None
+
+    userinfo = resp.json()
+    expires_in = int(userinfo.get("expires_in", 3600))
+    new_user = User.from_token_response(
+        token=token,
+        expires_in=expires_in,
+        userinfo=userinfo
+    )
+
+    users_cache.add_user(new_user)
+    return new_user
+
+
 # Проверка токена через заголовок
 async def verify_token(authorization: str = Header(...)) -> User:
     token = authorization.removeprefix("Bearer ").strip()
@@ -61,33 +131,28 @@ async def verify_token(authorization: str = Header(...)) -> User:
     user = users_cache.get_user_by_token(token)
 
     if user:
+        TOKEN_CACHE_HITS.inc()
+
         if user.is_token_valid():
             return user
 
-        refreshed = await user.refresh(app_config.client_id, app_config.client_secret)
+        refreshed = await refresh_requests.do(user.user_id, lambda: _refresh_user(user))
         if refreshed:
             return user
 
         # Если токен не валиден, удаляем пользователя из кеша
         users_cache.remove_user(user)
+    else:
+        TOKEN_CACHE_MISSES.inc()
+
+    # Недавно отклоненный токен не проверяем повторно
+    if rejected_tokens.contains(token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
     # Токена в кеше нет — проверяем через Яндекс
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            YANDEX_USERINFO_URL,
-            headers={"Authorization": f"OAuth {token}"}
-        )
+    new_user = await userinfo_requests.do(token, lambda: _fetch_user(token))
 
-    if resp.status_code != status.HTTP_200_OK:
+    if new_user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    userinfo = resp.json()
-    expires_in = int(userinfo.get("expires_in", 3600))
-    new_user = User.from_token_response(
-        token=token,
-        expires_in=expires_in,
-        userinfo=userinfo
-    )
-
-    users_cache.add_user(new_user)
     return new_user
@@ -1,32 +1,56 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from app.general.utils.verification import verify_api_key
-from app.pkg_smart_strip.models.Device import HSVColor, DeviceMode
+from app.pkg_smart_strip.models.Device import HSVColor, DeviceMode, SmartStripState, SmartStripStatePatch
 from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.DeviceRouter import device_router
+from app.pkg_smart_strip.models.Notifier import notifier
 
 router = APIRouter()
 
 
-@router.get("/smart-strip/v1.0/color", tags=["smart_strip"])
-async def color(device_id: str, api_key: str = Depends(verify_api_key)):
+# Состояние ленты этого воркера или, если лента подключена к другому воркеру, запрошенное у него
+async def read_state(device_id: str) -> SmartStripState | None:
     device = devices_registry.get_device_by_id(device_id)
+    if device:
+        return device.state
+
+    state = await device_router.get_state(device_id)
+    return SmartStripState(**state) if state else None
 
+
+# Изменение не пришло от Яндекса, поэтому сообщаем ему о нем сами
+async def write_state(device_id: str, patch: SmartStripStatePatch) -> bool:
+    device = devices_registry.get_device_by_id(device_id)
     if device:
+        patch.apply_to(device.state)
+        devices_registry.update_device_state(device)
+        notifier.device_changed(device_id)
+        return True
+
+    if await device_router.forward(device_id, patch) is None:
+        return False
+
+    notifier.device_changed(device_id)
+    return True
+
+
+@router.get("/smart-strip/v1.0/color", tags=["smart_strip"])
+async def color(device_id: str, api_key: str = Depends(verify_api_key)):
+    state = await read_state(device_id)
+
+    if state:
         return {
-            "h": device.state.hsv.h,
-            "s": device.state.hsv.s,
-            "v": device.state.hsv.v
+            "h": state.hsv.h,
+            "s": state.hsv.s,
+            "v": state.hsv.v
         }
     return {"msg": f"Device with device_id = {device_id} unavailable"}
 
 
 @router.post("/smart-strip/v1.0/color", tags=["smart_strip"])
 async def set_color(device_id: str, new_color: HSVColor, api_key: str = Depends(verify_api_key)):
-    device = devices_registry.get_device_by_id(device_id)
-
-    if device:
-        device.state.hsv = new_color
-        await devices_registry.update_device_state(device)
+    if await write_state(device_id, SmartStripStatePatch(hsv=new_color)):
         return {"msg": f"Device state updated"}
 
     return {"msg": f"Device with device_id = {device_id} unavailable"}
@@ -34,21 +58,18 @@ async def set_color(device_id: str, new_color: HSVColor, api_key: str = Depends(
 
 @router.get("/smart-strip/v1.0/brightness", tags=["smart_strip"])
 async def brightness(device_id: str, api_key: str = Depends(verify_api_key)):
-    device = devices_registry.get_device_by_id(device_id)
+    state = await read_state(device_id)
 
-    if device:
-        return device.state.brightness
+    if state:
+        return state.brightness
 
     return {"msg": f"Device with device_id = {device_id} unavailable"}
 
 
 @router.post("/smart-strip/v1.0/brightness", tags=["smart_strip"])
-async def set_brightness(device_id: str, new_brightness: int, api_key: str = Depends(verify_api_key)):
-    device = devices_registry.get_device_by_id(device_id)
-
-    if device:
-        device.state.brightness = new_brightness
-        await devices_registry.update_device_state(device)
+async def set_brightness(device_id: str, new_brightness: int = Query(ge=0, le=100),
+                         api_key: str = Depends(verify_api_key)):
+    if await write_state(device_id, SmartStripStatePatch(brightness=new_brightness)):
         return {"msg": f"Device state updated"}
 
     return {"msg": f"Device with device_id = {device_id} unavailable"}
@@ -56,21 +77,17 @@ async def set_brightness(device_id: str, new_brightness: int, api_key: str = Dep
 
 @router.get("/smart-strip/v1.0/program", tags=["smart_strip"])
 async def program(device_id: str, api_key: str = Depends(verify_api_key)):
-    device = devices_registry.get_device_by_id(device_id)
+    state = await read_state(device_id)
 
-    if device:
-        return device.state.program
+    if state:
+        return state.program
 
     return {"msg": f"Device with device_id = {device_id} unavailable"}
 
 
 @router.post("/smart-strip/v1.0/program", tags=["smart_strip"])
 async def set_program(device_id: str, new_program: DeviceMode, api_key: str = Depends(verify_api_key)):
-    device = devices_registry.get_device_by_id(device_id)
-
-    if device:
-        device.state.program = new_program
-        await devices_registry.update_device_state(device)
+    if await write_state(device_id, SmartStripStatePatch(program=new_program)):
         return {"msg": f"Device state updated"}
 
     return {"msg": f"Device with device_id = {device_id} unavailable"}
@@ -78,21 +95,17 @@ async def set_program(device_id: str, new_program: DeviceMode, api_key: str = De
 
 @router.get("/smart-strip/v1.0/state", tags=["smart_strip"])
 async def state(device_id: str, api_key: str = Depends(verify_api_key)):
-    device = devices_registry.get_device_by_id(device_id)
+    device_state = await read_state(device_id)
 
-    if device:
-        return device.state.on
+    if device_state:
+        return device_state.on
 
     return {"msg": f"Device with device_id = {device_id} unavailable"}
 
 
 @router.post("/smart-strip/v1.0/state", tags=["smart_strip"])
 async def set_state(device_id: str, new_state: bool, api_key: str = Depends(verify_api_key)):
-    device = devices_registry.get_device_by_id(device_id)
-
-    if device:
-        device.state.on = new_state
-        await devices_registry.update_device_state(device)
+    if await write_state(device_id, SmartStripStatePatch(on=new_state)):
         return {"msg": f"Device state updated"}
 
     return {"msg": f"Device with device_id = {device_id} unavailable"}
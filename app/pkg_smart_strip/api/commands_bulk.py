@@ -0,0 +1,92 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+
+from app.general.utils.config import app_config
+from app.general.utils.verification import verify_api_key
+from app.pkg_smart_strip.models.Device import SmartStripDevice, SmartStripStatePatch
+from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.DeviceRouter import device_router
+from app.pkg_smart_strip.models.Notifier import notifier
+
+router = APIRouter()
+
+
+class BulkCommand(BaseModel):
+    device_ids: list[str] | None = None
+    group: str | None = None
+    all: bool = False
+    state: SmartStripStatePatch
+    # Дождаться отправки состояния лентам, иначе ответ возвращается сразу после постановки в очередь
+    wait: bool = False
+
+
+# Локальные ленты и id лент, которые нужно искать на других воркерах
+async def resolve_targets(command: BulkCommand) -> tuple[list[SmartStripDevice], list[str]]:
+    if command.all:
+        local_ids = set(devices_registry.get_devices())
+        remote = [device_id for device_id in await device_router.list_devices() if device_id not in local_ids]
+        return devices_registry.values(), remote
+
+    if command.group is not None:
+        devices = devices_registry.get_devices_by_group(command.group)
+        local_ids = {device.id for device in devices}
+        remote = [device_id for device_id in await device_router.list_group(command.group) if device_id not in local_ids]
+        return devices, remote
+
+    devices, remote = [], []
+    for device_id in dict.fromkeys(command.device_ids):
+        device = devices_registry.get_device_by_id(device_id)
+        if device:
+            devices.append(device)
+        else:
+            remote.append(device_id)
+    return devices, remote
+
+
+async def wait_sent(future: asyncio.Future) -> str:
+    try:
+        sent = await asyncio.wait_for(asyncio.shield(future), timeout=app_config.device_send_timeout)
+    except asyncio.TimeoutError:
+        sent = False
+    return "DONE" if sent else "ERROR"
+
+
+async def forward_remote(device_id: str, patch: SmartStripStatePatch) -> str:
+    sent = await device_router.forward(device_id, patch)
+    if sent is None:
+        return "NOT_FOUND"
+
+    notifier.device_changed(device_id)
+    return "DONE" if sent else "ERROR"
+
+
+@router.post("/smart-strip/v1.0/bulk", tags=["smart_strip"])
+async def bulk_command(command: BulkCommand, api_key: str = Depends(verify_api_key)):
+    selectors = [command.device_ids is not None, command.group is not None, command.all]
+    if sum(selectors) != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Exactly one of device_ids, group or all must be set"
+        )
+
+    devices, remote = await resolve_targets(command)
+
+    futures = []
+    for device in devices:
+        command.state.apply_to(device.state)
+        futures.append(devices_registry.update_device_state(device))
+        notifier.device_changed(device.id)
+
+    if command.wait:
+        statuses = await asyncio.gather(*(wait_sent(future) for future in futures))
+    else:
+        statuses = ["QUEUED"] * len(futures)
+
+    remote_statuses = await asyncio.gather(*(forward_remote(device_id, command.state) for device_id in remote))
+
+    results = [{"id": device.id, "status": result} for device, result in zip(devices, statuses)]
+    results.extend({"id": device_id, "status": result} for device_id, result in zip(remote, remote_statuses))
+
+    return {"devices": results}
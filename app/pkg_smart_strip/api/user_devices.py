@@ -1,22 +1,49 @@
-from fastapi import APIRouter, Depends, Request
+import json
+
+from fastapi import APIRouter, Depends, Request, Response
 
 from app.general.utils.verification import verify_token
+from app.pkg_smart_strip.models.Device import SmartStripDevice
 from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.DeviceRouter import device_router
 from app.pkg_smart_strip.models.User import User
 
 router = APIRouter()
 
+# Описания лент других воркеров; для одного типа устройства они отличаются только id
+remote_discovery: dict[str, bytes] = dict()
+
+
+# Кеш хранит только ленты из текущего списка, описания отключившихся лент не копятся
+def get_remote_discovery(device_ids: list[str]) -> list[bytes]:
+    fragments = {
+        device_id: remote_discovery.get(device_id) or SmartStripDevice(device_id).discovery_json()
+        for device_id in device_ids
+    }
+
+    remote_discovery.clear()
+    remote_discovery.update(fragments)
+    return list(fragments.values())
+
 
 @router.get("/smart-strip/v1.0/user/devices", tags=["smart_strip"])
 async def devices(request: Request, user: User = Depends(verify_token)):
     request_id = request.headers.get("X-Request-Id")
     user_id = user.user_id
-    all_devices = list(devices_registry.values())
-
-    return {
-        "request_id": request_id,
-        "payload": {
-            "user_id": user_id,
-            "devices": all_devices
-        }
-    }
+    all_devices = devices_registry.get_discovery_payload()
+
+    # Ленты, подключенные к другим воркерам
+    local_ids = set(devices_registry.get_devices())
+    remote = get_remote_discovery([
+        device_id for device_id in await device_router.list_devices() if device_id not in local_ids
+    ])
+    if remote:
+        all_devices = b",".join([all_devices, *remote]) if all_devices else b",".join(remote)
+
+    # Ответ собирается из готовых фрагментов, без валидации и сериализации моделей на каждый запрос
+    content = b"".join([
+        b'{"request_id":', json.dumps(request_id).encode(),
+        b',"payload":{"user_id":', json.dumps(user_id).encode(),
+        b',"devices":[', all_devices, b']}}'
+    ])
+    return Response(content=content, media_type="application/json")
@@ -1,11 +1,15 @@
-from typing import Any
+import asyncio
+from typing import Any, Awaitable, Callable
 
 from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 
+from app.general.utils.config import app_config
 from app.general.utils.verification import verify_token
+from app.pkg_smart_strip.models.Capabilities import apply_capability
 from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
-from app.pkg_smart_strip.models.Device import DeviceMode
+from app.pkg_smart_strip.models.Device import SmartStripDevice, SmartStripState, SmartStripStatePatch
+from app.pkg_smart_strip.models.DeviceRouter import device_router
 from app.pkg_smart_strip.models.User import User
 
 router = APIRouter()
@@ -35,89 +39,92 @@ class ActionRequest(BaseModel):
     payload: ActionPayload
 
 
+async def send_local(device: SmartStripDevice) -> bool:
+    try:
+        return await asyncio.wait_for(
+            asyncio.shield(devices_registry.update_device_state(device)),
+            timeout=app_config.device_send_timeout
+        )
+    except asyncio.TimeoutError:
+        return False
+
+
+# Сначала применяем все возможности устройства, затем отправляем ленте одно итоговое состояние
+async def action_device(requested_device: ActionDevice, device: SmartStripDevice,
+                        send: Callable[[SmartStripDevice], Awaitable[bool]]) -> dict:
+    results = [
+        (cap, *apply_capability(device, cap.type, cap.state.instance, cap.state.value))
+        for cap in requested_device.capabilities
+    ]
+
+    if any(status == "DONE" for _, status, _, _ in results):
+        if not await send(device):
+            results = [
+                (cap, "ERROR", "DEVICE_UNREACHABLE", f"Device {device.id} is unreachable")
+                if status == "DONE" else (cap, status, error_code, error_message)
+                for cap, status, error_code, error_message in results
+            ]
+
+    caps_result = []
+
+    for cap, status, error_code, error_message in results:
+        result = {
+            "type": cap.type,
+            "state": {
+                "instance": cap.state.instance,
+                "action_result": {
+                    "status": status
+                }
+            }
+        }
+
+        if status == "ERROR":
+            result["state"]["action_result"].update({
+                "error_code": error_code,
+                "error_message": error_message
+            })
+
+        caps_result.append(result)
+
+    return {
+        "id": device.id,
+        "capabilities": caps_result
+    }
+
+
+# Лента подключена к другому воркеру: применяем действия к копии ее состояния и пересылаем только изменения
+async def action_remote_device(requested_device: ActionDevice) -> dict | None:
+    state = await device_router.get_state(requested_device.id)
+    if state is None:
+        return None
+
+    device = SmartStripDevice(requested_device.id)
+    device.state = SmartStripState(**state)
+    before = device.state_dict()
+
+    async def send_remote(changed_device: SmartStripDevice) -> bool:
+        changed = {key: value for key, value in changed_device.state_dict().items() if before.get(key) != value}
+        return bool(await device_router.forward(changed_device.id, SmartStripStatePatch(**changed)))
+
+    return await action_device(requested_device, device, send_remote)
+
+
 @router.post("/smart-strip/v1.0/user/devices/action", tags=["smart_strip"])
 async def action_devices(request: Request, body: ActionRequest, user: User = Depends(verify_token)):
     request_id = request.headers.get("X-Request-Id")
-    response_devices = []
 
-    for requested_device in body.payload.devices:
-        device_id = requested_device.id
-        device = devices_registry.get_device_by_id(device_id)
-        if not device:
-            continue
-
-        caps_result = []
-
-        for cap in requested_device.capabilities:
-            inst = cap.state.instance
-            val = cap.state.value
-            status = "ERROR"
-            error_code = None
-            error_message = None
-
-            if inst == "on":
-                if val in [True, False]:
-                    device.state.on = val
-                    await devices_registry.update_device_state(device)
-                    status = "DONE"
-                else:
-                    error_code = "INVALID_VALUE"
-                    error_message = f"Invalid value {val} for 'on'"
-
-            elif inst == "brightness":
-                if isinstance(val, int) and 0 <= val <= 100:
-                    device.state.brightness = val
-                    await devices_registry.update_device_state(device)
-                    status = "DONE"
-                else:
-                    error_code = "INVALID_VALUE"
-                    error_message = f"Invalid brightness value: {val}"
-
-            elif inst == "program":
-                if val in ["one", "two", "three", "four", "five"]:
-                    device.state.program = val
-                    await devices_registry.update_device_state(device)
-                    status = "DONE"
-                else:
-                    error_code = "INVALID_VALUE"
-                    error_message = f"Invalid mode: {val}"
-
-            elif inst == "hsv":
-                if isinstance(val, dict) and all(k in val for k in ["h", "s", "v"]):
-                    device.state.hsv = val
-                    device.state.program = DeviceMode.five
-                    await devices_registry.update_device_state(device)
-                    status = "DONE"
-                else:
-                    error_code = "INVALID_VALUE"
-                    error_message = f"Invalid HSV value: {val}"
-
-            else:
-                error_code = "UNSUPPORTED_CAPABILITY"
-                error_message = f"Unsupported capability instance: {inst}"
-
-            result = {
-                "type": cap.type,
-                "state": {
-                    "instance": inst,
-                    "action_result": {
-                        "status": status
-                    }
-                }
-            }
+    # Устройства обрабатываются параллельно, медленная лента не задерживает остальные
+    actions = []
 
-            if status == "ERROR":
-                result["state"]["action_result"].update({
-                    "error_code": error_code,
-                    "error_message": error_message
-                })
+    for requested_device in body.payload.devices:
+        device = devices_registry.get_device_by_id(requested_device.id)
 
-            caps_result.append(result)
+        if device:
+            actions.append(action_device(requested_device, device, send_local))
+        else:
+            actions.append(action_remote_device(requested_device))
 
-        response_devices.append({
-            "id": device.id,
-            "capabilities": caps_result
-        })
+    response_devices = [result for result in await asyncio.gather(*actions) if result is not None]
 
     return {
         "request_id": request_id,
@@ -1,8 +1,14 @@
 from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from app.general.utils.verification import verify_token
+from app.pkg_smart_strip.models.Capabilities import query_capabilities
+from app.pkg_smart_strip.models.Device import SmartStripDevice, SmartStripState
 from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.DeviceRouter import device_router
+from app.pkg_smart_strip.models.Heartbeat import heartbeat
+from app.pkg_smart_strip.models.StateStore import state_store
 from app.pkg_smart_strip.models.User import User
 
 router = APIRouter()
@@ -16,6 +22,13 @@ class QueryRequest(BaseModel):
     devices: list[DeviceQuery]
 
 
+# Лента, которую мы уже видели, сейчас недоступна; о неизвестной сообщаем отдельно
+def unavailable_device(device_id: str) -> dict:
+    if state_store.get_device_state(device_id) is not None:
+        return {"id": device_id, "error_code": "DEVICE_UNREACHABLE", "error_message": "Device is offline"}
+    return {"id": device_id, "error_code": "DEVICE_NOT_FOUND", "error_message": "Device not found"}
+
+
 @router.post("/smart-strip/v1.0/user/devices/query", tags=["smart_strip"])
 async def devices_query(request: Request, body: QueryRequest, user: User = Depends(verify_token)):
     request_id = request.headers.get("X-Request-Id")
@@ -23,51 +36,31 @@ async def devices_query(request: Request, body: QueryRequest, user: User = Depen
 
     for requested_device in body.devices:
         device = devices_registry.get_device_by_id(requested_device.id)
-        if not device:
-            continue
-
-        capabilities = []
-
-        for cap in device.capabilities:
-            cap_type = cap.type
-            instance = None
-            value = None
-
-            if cap_type == "devices.capabilities.on_off":
-                instance = "on"
-                value = device.state.on
 
-            elif cap_type == "devices.capabilities.range":
-                instance = cap.parameters.get("instance")
-                value = device.state.brightness
-
-            elif cap_type == "devices.capabilities.mode":
-                instance = cap.parameters.get("instance")
-                value = device.state.program
-
-            elif cap_type == "devices.capabilities.color_setting":
-                instance = cap.parameters.get("color_model")
-                value = device.state.hsv
-
-            if not instance or not value:
+        # Лента может быть подключена к другому воркеру
+        if not device:
+            state = await device_router.get_state(requested_device.id)
+            if state is None:
+                response_devices.append(unavailable_device(requested_device.id))
                 continue
 
-            capabilities.append({
-                "type": cap_type,
-                "state": {
-                    "instance": instance,
-                    "value": value
-                }
-            })
+            device = SmartStripDevice(requested_device.id)
+            device.state = SmartStripState(**state)
+
+        # Соединение есть, но лента не отвечает на heartbeat — скоро будет отключена
+        elif heartbeat.is_stale(device):
+            response_devices.append(unavailable_device(device.id))
+            continue
 
         response_devices.append({
             "id": device.id,
-            "capabilities": capabilities
+            "capabilities": query_capabilities(device)
         })
 
-    return {
+    # Значения возможностей уже готовы для JSON, поэтому обходимся без jsonable_encoder
+    return JSONResponse(content={
         "request_id": request_id,
         "payload": {
             "devices": response_devices
         }
-    }
+    })
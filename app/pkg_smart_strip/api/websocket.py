@@ -1,29 +1,161 @@
+import json
+
 from fastapi import WebSocket, WebSocketDisconnect, APIRouter
+from pydantic import ValidationError
 
-from app.general.utils.logger import logger
+from app.general.utils.logger import logger, log_device_debug, device_log_limiter
 from app.general.utils.verification import verify_websocket
-from app.pkg_smart_strip.models.Device import SmartStripDevice
+from app.pkg_smart_strip.models.Device import SmartStripDevice, SmartStripState
 from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.DeviceRouter import device_router
+from app.pkg_smart_strip.models.Heartbeat import heartbeat
+from app.pkg_smart_strip.models.Notifier import notifier
+from app.pkg_smart_strip.models.StateStore import state_store
+from app.pkg_smart_strip.models.WireFormat import (
+    WireFormat, FrameType, BINARY_SUBPROTOCOL, DELTA_SUBPROTOCOL, decode_frame
+)
 
 router = APIRouter()
 
+FRAME_TYPES = {
+    FrameType.STATE: "state",
+    FrameType.RESYNC: "resync",
+    FrameType.REPORT: "report",
+    FrameType.PING: "ping",
+    FrameType.PONG: "pong",
+    FrameType.ACK: "ack"
+}
+
+
+# Разбираем сообщение ленты в общий вид {"type": ..., "seq": ..., "state": ...}; нераспознанное игнорируем
+def parse_message(data: str | bytes) -> dict | None:
+    if isinstance(data, bytes):
+        try:
+            frame_type, seq, state = decode_frame(data)
+        except ValueError:
+            return None
+
+        message = {"type": FRAME_TYPES.get(frame_type), "seq": seq}
+        if state is not None:
+            message["state"] = state
+        return message
+
+    if not data.startswith("{"):
+        return None
+
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return None
+
+    return message if isinstance(message, dict) else None
+
+
+# Формат кадров выбирается подпротоколом websocket или параметрами ?format=binary и ?proto=2.
+# По умолчанию исходный протокол с полным состоянием в каждом кадре, как у уже прошитых лент
+def negotiate_wire_format(websocket: WebSocket) -> tuple[WireFormat, str | None]:
+    subprotocols = websocket.scope.get("subprotocols", [])
+
+    if BINARY_SUBPROTOCOL in subprotocols:
+        return WireFormat.BINARY, BINARY_SUBPROTOCOL
+
+    if websocket.query_params.get("format") == WireFormat.BINARY:
+        return WireFormat.BINARY, None
+
+    if DELTA_SUBPROTOCOL in subprotocols:
+        return WireFormat.JSON_DELTA, DELTA_SUBPROTOCOL
+
+    if websocket.query_params.get("proto") == "2":
+        return WireFormat.JSON_DELTA, None
+
+    return WireFormat.JSON, None
+
 
 @router.websocket("/smart-strip/v1.0/websocket/{device_id}")
 async def websocket_endpoint(websocket: WebSocket, device_id: str):
     if not await verify_websocket(websocket):
         return
 
-    await websocket.accept()
+    wire_format, subprotocol = negotiate_wire_format(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+
+    # Группы ленты передаются параметром ?groups=kitchen,floor-2
+    groups = frozenset(group for group in websocket.query_params.get("groups", "").split(",") if group)
+    # Лента с ?acks=1 подтверждает каждый кадр состояния; в исходном протоколе у кадров нет seq, подтверждать нечего
+    acks = websocket.query_params.get("acks") == "1" and wire_format != WireFormat.JSON
+    # Лента с ?heartbeat=1 отвечает на ping, и ее молчание дольше HEARTBEAT_TIMEOUT считается обрывом
+    pings = websocket.query_params.get("heartbeat") == "1"
 
-    new_device = SmartStripDevice(device_id=device_id, connection=websocket)
+    new_device = SmartStripDevice(device_id=device_id, connection=websocket, wire_format=wire_format, groups=groups,
+                                  acks=acks, heartbeat=pings)
     devices_registry.add_device(new_device)
+    device_router.publish(device_id, groups)
+    heartbeat.watch(new_device)
+
+    # Лента, которая уже подключалась раньше, сразу получает свое последнее состояние
+    saved_state = state_store.get_device_state(device_id)
+    try:
+        restored = SmartStripState(**saved_state) if saved_state else None
+    except ValidationError as e:
+        # Состояние, сохраненное до появления ограничений на значения, отбрасываем
+        logger.warning("Ignoring invalid saved state of %s: %s", device_id, e)
+        restored = None
 
-    logger.debug(f"New connection added with device_id = {device_id}")
+    if restored:
+        new_device.state = restored
+        devices_registry.update_device_state(new_device)
+    else:
+        # Запоминаем ленту, чтобы после отключения отвечать Яндексу DEVICE_UNREACHABLE
+        state_store.save_device(device_id, new_device.state_dict())
+
+    logger.debug("New connection added with device_id = %s (%s)", device_id, wire_format)
 
     try:
         while True:
-            data = await websocket.receive_text()
-            logger.debug(f"Message from {device_id}: {data}")
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+
+            # Любое сообщение, в том числе pong, подтверждает, что лента жива
+            new_device.touch()
+
+            data = received.get("text")
+            if data is None:
+                data = received.get("bytes")
+
+            log_device_debug(device_id, "Message from %s: %s", device_id, data)
+
+            message = parse_message(data)
+            if not message:
+                continue
+
+            kind = message.get("type")
+            seq = message.get("seq")
+            if not isinstance(seq, int):
+                seq = None
+
+            # Лента пропустила кадр — досылаем полное состояние
+            if kind == "resync":
+                new_device.reset_state_sync()
+                devices_registry.update_device_state(new_device)
+
+            # Лента применила кадр seq и все предыдущие
+            elif kind == "ack" and seq is not None and new_device.outbox:
+                new_device.outbox.on_ack(seq)
+
+            # Состояние изменилось на стороне ленты
+            elif kind == "report" and isinstance(message.get("state"), dict):
+                try:
+                    if devices_registry.apply_report(new_device, seq, message["state"]):
+                        notifier.device_changed(device_id)
+                except ValidationError as e:
+                    logger.debug("Invalid report from %s: %s", device_id, e)
     except WebSocketDisconnect:
-        devices_registry.remove_device_by_id(device_id)
-        logger.debug(f"Client {device_id} disconnected")
+        logger.debug("Client %s disconnected", device_id)
+    finally:
+        devices_registry.remove_device(new_device)
+        device_log_limiter.forget(device_id)
+
+        # Лента могла переподключиться к этому же воркеру, тогда она по-прежнему наша
+        if not devices_registry.get_device_by_id(device_id):
+            device_router.unpublish(device_id)
@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from pydantic import ValidationError
+
+from app.pkg_smart_strip.models.Device import Capability, Device, DeviceMode, HSVColor, SmartStripState
+
+ON_OFF = "devices.capabilities.on_off"
+RANGE = "devices.capabilities.range"
+MODE = "devices.capabilities.mode"
+COLOR_SETTING = "devices.capabilities.color_setting"
+
+PROGRAMS = frozenset(mode.value for mode in DeviceMode)
+
+
+@dataclass(frozen=True)
+class CapabilityHandler:
+    type: str
+    instance: str
+    # Значение для ответа Яндексу, уже пригодное для JSON
+    get: Callable[[SmartStripState], Any]
+    validate: Callable[[Any], bool]
+    set: Callable[[SmartStripState, Any], None]
+    error_message: str
+
+
+def _set_on(state: SmartStripState, value: Any):
+    state.on = bool(value)
+
+
+def _set_brightness(state: SmartStripState, value: Any):
+    state.brightness = value
+
+
+def _set_program(state: SmartStripState, value: Any):
+    state.program = DeviceMode(value)
+
+
+def _is_hsv(value: Any) -> bool:
+    if not isinstance(value, dict) or not all(k in value for k in ["h", "s", "v"]):
+        return False
+
+    try:
+        HSVColor(**value)
+    except ValidationError:
+        return False
+    return True
+
+
+# Цвет задается только в программе five
+def _set_hsv(state: SmartStripState, value: Any):
+    state.hsv = HSVColor(**value)
+    state.program = DeviceMode.five
+
+
+HANDLERS: dict[tuple[str, str], CapabilityHandler] = {
+    (handler.type, handler.instance): handler for handler in [
+        CapabilityHandler(
+            type=ON_OFF,
+            instance="on",
+            get=lambda state: state.on,
+            validate=lambda value: value in [True, False],
+            set=_set_on,
+            error_message="Invalid value {value} for 'on'"
+        ),
+        CapabilityHandler(
+            type=RANGE,
+            instance="brightness",
+            get=lambda state: state.brightness,
+            # bool — подкласс int, True не должен становиться яркостью 1
+            validate=lambda value: isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 100,
+            set=_set_brightness,
+            error_message="Invalid brightness value: {value}"
+        ),
+        CapabilityHandler(
+            type=MODE,
+            instance="program",
+            get=lambda state: DeviceMode(state.program).value,
+            validate=lambda value: value in PROGRAMS,
+            set=_set_program,
+            error_message="Invalid mode: {value}"
+        ),
+        CapabilityHandler(
+            type=COLOR_SETTING,
+            instance="hsv",
+            get=lambda state: {"h": state.hsv.h, "s": state.hsv.s, "v": state.hsv.v},
+            validate=_is_hsv,
+            set=_set_hsv,
+            error_message="Invalid HSV value: {value}"
+        )
+    ]
+}
+
+
+def capability_instance(capability: Capability) -> str:
+    if capability.type == ON_OFF:
+        return "on"
+
+    if capability.type == COLOR_SETTING:
+        return capability.parameters.get("color_model")
+
+    return capability.parameters.get("instance")
+
+
+# Обработчики всех возможностей устройства, собираются один раз на тип устройства
+_device_handlers: dict[str, tuple[CapabilityHandler, ...]] = dict()
+
+
+def get_device_handlers(device: Device) -> tuple[CapabilityHandler, ...]:
+    handlers = _device_handlers.get(device.type)
+
+    if handlers is None:
+        handlers = tuple(
+            HANDLERS[key] for key in (
+                (capability.type, capability_instance(capability)) for capability in device.capabilities
+            ) if key in HANDLERS
+        )
+        _device_handlers[device.type] = handlers
+    return handlers
+
+
+def query_capabilities(device: Device) -> list[dict[str, Any]]:
+    return [
+        {
+            "type": handler.type,
+            "state": {
+                "instance": handler.instance,
+                "value": handler.get(device.state)
+            }
+        }
+        for handler in get_device_handlers(device)
+    ]
+
+
+# Применяем одну возможность к состоянию устройства, возвращаем (status, error_code, error_message)
+def apply_capability(device: Device, cap_type: str, instance: str, value: Any) -> tuple[str, str | None, str | None]:
+    handler = HANDLERS.get((cap_type, instance))
+
+    if handler is None:
+        return "ERROR", "UNSUPPORTED_CAPABILITY", f"Unsupported capability instance: {instance}"
+
+    if not handler.validate(value):
+        return "ERROR", "INVALID_VALUE", handler.error_message.format(value=value)
+
+    handler.set(device.state, value)
+    return "DONE", None, None
@@ -1,8 +1,10 @@
+import time
 from enum import Enum
-from typing import Any, TypeVar, Generic
+from types import MappingProxyType
+from typing import Any, Mapping, TypeVar, Generic
 
 from fastapi import WebSocket
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, field_serializer, field_validator
 
 STATE = TypeVar("STATE", bound=BaseModel)
 
@@ -15,10 +17,41 @@ class DeviceMode(str, Enum):
     five = "five"
 
 
+# frozen у модели не защищает вложенные словари и списки, поэтому параметры замораживаются целиком
+def _freeze(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+# Описания возможностей и устройства общие для всех лент одного типа, поэтому неизменяемые
 class Capability(BaseModel):
     type: str
     retrievable: bool = False
-    parameters: dict[str, Any] | None = None
+    parameters: Mapping[str, Any] | None = None
+
+    model_config = {
+        "frozen": True
+    }
+
+    @field_validator("parameters")
+    @classmethod
+    def _freeze_parameters(cls, parameters: Mapping[str, Any] | None) -> Mapping[str, Any] | None:
+        return None if parameters is None else _freeze(parameters)
+
+    @field_serializer("parameters")
+    def _serialize_parameters(self, parameters: Mapping[str, Any] | None) -> dict[str, Any] | None:
+        return None if parameters is None else _thaw(parameters)
 
 
 class DeviceInfo(BaseModel):
@@ -27,11 +60,16 @@ class DeviceInfo(BaseModel):
     hw_version: str | None = None
     sw_version: str | None = None
 
+    model_config = {
+        "frozen": True
+    }
 
+
+# Диапазоны модели hsv Яндекса; в бинарном кадре h занимает uint16, s и v — uint8
 class HSVColor(BaseModel):
-    h: int
-    s: int
-    v: int
+    h: int = Field(ge=0, le=360)
+    s: int = Field(ge=0, le=100)
+    v: int = Field(ge=0, le=100)
 
 
 class SmartStripState(BaseModel):
@@ -40,12 +78,35 @@ class SmartStripState(BaseModel):
     program: DeviceMode = DeviceMode.one
     hsv: HSVColor = HSVColor(h=240, s=100, v=100)
 
+    # Быстрое представление состояния для ленты, без сериализации pydantic
+    def to_wire(self) -> dict[str, Any]:
+        return {
+            "on": self.on,
+            "brightness": self.brightness,
+            "program": DeviceMode(self.program).value,
+            "hsv": {"h": self.hsv.h, "s": self.hsv.s, "v": self.hsv.v}
+        }
+
+
+# Частичное состояние: применяются только переданные поля
+class SmartStripStatePatch(BaseModel):
+    on: bool | None = None
+    brightness: int | None = Field(default=None, ge=0, le=100)
+    program: DeviceMode | None = None
+    hsv: HSVColor | None = None
+
+    def apply_to(self, state: SmartStripState):
+        for field in self.model_fields_set:
+            value = getattr(self, field)
+            if value is not None:
+                setattr(state, field, value)
+
 
 class Device(BaseModel, Generic[STATE]):
     id: str
     name: str
     type: str = Field(..., alias="device_type")
-    capabilities: list[Capability] = []
+    capabilities: tuple[Capability, ...] = ()
     device_info: DeviceInfo
     state: STATE
     connection: WebSocket | None = None
@@ -54,54 +115,176 @@ class Device(BaseModel, Generic[STATE]):
         "arbitrary_types_allowed": True
     }
 
+    # Номер последнего отправленного кадра и состояние, которое лента уже получила
+    _seq: int = PrivateAttr(default=0)
+    _sent_state: dict[str, Any] | None = PrivateAttr(default=None)
+    # Лента запросила полное состояние; флаг читает следующий собранный кадр
+    _resync: bool = PrivateAttr(default=False)
+    # Формат кадров, согласованный при подключении: "json", "json.v2" или "binary"
+    _wire_format: str = PrivateAttr(default="json")
+    # Очередь исходящих кадров, которую назначает реестр при подключении
+    _outbox: Any = PrivateAttr(default=None)
+    # Группы, в которые лента входит для массовых команд
+    _groups: frozenset[str] = PrivateAttr(default=frozenset())
+    # Лента подтверждает кадры состояния сообщением ack, команда считается выполненной только после него
+    _acks: bool = PrivateAttr(default=False)
+    # Номер последнего принятого отчета ленты о своем состоянии
+    _report_seq: int = PrivateAttr(default=0)
+    # Когда от ленты последний раз что-то приходило (time.monotonic)
+    _last_seen: float = PrivateAttr(default_factory=time.monotonic)
+    # Лента понимает ping и согласилась, что ее молчание считается обрывом связи
+    _heartbeat: bool = PrivateAttr(default=False)
+
+    @property
+    def wire_format(self) -> str:
+        return self._wire_format
+
+    @property
+    def groups(self) -> frozenset[str]:
+        return self._groups
+
+    @property
+    def acks(self) -> bool:
+        return self._acks
+
+    @property
+    def last_seen(self) -> float:
+        return self._last_seen
+
+    @property
+    def heartbeat(self) -> bool:
+        return self._heartbeat
+
+    def touch(self):
+        self._last_seen = time.monotonic()
+
+    @property
+    def outbox(self) -> Any:
+        return self._outbox
+
+    def attach_outbox(self, outbox: Any):
+        self._outbox = outbox
+
+    def state_dict(self) -> dict[str, Any]:
+        return self.state.model_dump(mode="json")
+
+    # Описание устройства для ответа Яндексу на запрос списка устройств, без состояния и соединения
+    def discovery_json(self) -> bytes:
+        return self.model_dump_json(include={"id", "name", "type", "capabilities", "device_info"}).encode()
+
+    # Кадр с полным состоянием после (пере)подключения, дальше — только изменившиеся поля.
+    # Кадр собирается на каждое изменение, а приватные атрибуты pydantic читаются через медленный
+    # __getattr__, поэтому здесь и в confirm_state_frame они берутся прямо из __pydantic_private__
+    def build_state_frame(self, full: bool = False) -> dict[str, Any] | None:
+        current = self.state_dict()
+        private = self.__pydantic_private__
+        sent = private["_sent_state"]
+        seq = private["_seq"] + 1
+
+        if sent is not None and not private["_resync"]:
+            delta = {key: value for key, value in current.items() if sent.get(key) != value}
+            if not delta:
+                return None
+
+            if not full:
+                return {"seq": seq, "delta": delta}
+
+        return {"seq": seq, "full": current}
+
+    def confirm_state_frame(self, frame: dict[str, Any]):
+        private = self.__pydantic_private__
+        private["_seq"] = frame["seq"]
+
+        if "full" in frame:
+            private["_sent_state"] = dict(frame["full"])
+            private["_resync"] = False
+        else:
+            private["_sent_state"].update(frame["delta"])
+
+    # Лента сообщила о пропуске кадров — следующим отправим полное состояние. Кадр, который уже
+    # отправляется, подтверждается как обычно, поэтому известное ленте состояние здесь не сбрасываем
+    def reset_state_sync(self):
+        self._resync = True
+
+    # Отчеты с уже виденным номером (повтор или переупорядочивание) пропускаем; отчет без номера принимаем
+    def accept_report(self, seq: int | None) -> bool:
+        if seq is None:
+            return True
+
+        if seq <= self._report_seq:
+            return False
+
+        self._report_seq = seq
+        return True
+
+    # Поля из отчета у ленты уже есть, повторно их не отправляем
+    def confirm_reported(self, fields: set[str]):
+        if self._sent_state is not None:
+            current = self.state_dict()
+            self._sent_state.update({key: current[key] for key in fields if key in current})
+
+
+# Создаются один раз при импорте и разделяются всеми лентами
+SMART_STRIP_CAPABILITIES: tuple[Capability, ...] = (
+    Capability(
+        type="devices.capabilities.on_off",
+        retrievable=True,
+        parameters={}
+    ),
+    Capability(
+        type="devices.capabilities.range",
+        retrievable=True,
+        parameters={
+            "instance": "brightness",
+            "unit": "unit.percent",
+            "range": {
+                "min": 0,
+                "max": 100,
+                "precision": 1
+            }
+        }
+    ),
+    Capability(
+        type="devices.capabilities.mode",
+        retrievable=True,
+        parameters={
+            "instance": "program",
+            "modes": tuple({"value": mode} for mode in DeviceMode)
+        }
+    ),
+    Capability(
+        type="devices.capabilities.color_setting",
+        retrievable=True,
+        parameters={
+            "color_model": "hsv"
+        }
+    )
+)
+
+SMART_STRIP_DEVICE_INFO = DeviceInfo(
+    manufacturer="Maxs",
+    model="Strip",
+    hw_version="1.0",
+    sw_version="1.0"
+)
+
 
 class SmartStripDevice(Device[SmartStripState]):
-    def __init__(self, device_id: str, connection: WebSocket | None = None):
+    def __init__(self, device_id: str, connection: WebSocket | None = None, wire_format: str = "json",
+                 groups: frozenset[str] = frozenset(), acks: bool = False, heartbeat: bool = False):
         super().__init__(
             id=device_id,
             name="Умная лента",
             device_type="devices.types.light",
-            capabilities=[
-                Capability(
-                    type="devices.capabilities.on_off",
-                    retrievable=True,
-                    parameters={}
-                ),
-                Capability(
-                    type="devices.capabilities.range",
-                    retrievable=True,
-                    parameters={
-                        "instance": "brightness",
-                        "unit": "unit.percent",
-                        "range": {
-                            "min": 0,
-                            "max": 100,
-                            "precision": 1
-                        }
-                    }
-                ),
-                Capability(
-                    type="devices.capabilities.mode",
-                    retrievable=True,
-                    parameters={
-                        "instance": "program",
-                        "modes": [{"value": mode} for mode in DeviceMode]
-                    }
-                ),
-                Capability(
-                    type="devices.capabilities.color_setting",
-                    retrievable=True,
-                    parameters={
-                        "color_model": "hsv"
-                    }
-                )
-            ],
-            device_info=DeviceInfo(
-                manufacturer="Maxs",
-                model="Strip",
-                hw_version="1.0",
-                sw_version="1.0"
-            ),
+            capabilities=SMART_STRIP_CAPABILITIES,
+            device_info=SMART_STRIP_DEVICE_INFO,
             state=SmartStripState(),
             connection=connection
         )
+        self._wire_format = wire_format
+        self._groups = groups
+        self._acks = acks
+        self._heartbeat = heartbeat
+
+    def state_dict(self) -> dict[str, Any]:
+        return self.state.to_wire()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable
+
+from fastapi import WebSocketDisconnect
+
+from app.general.utils.config import app_config
+from app.general.utils.logger import logger, log_device_debug
+from app.general.utils.metrics import metrics
+from app.pkg_smart_strip.models.Device import Device
+from app.pkg_smart_strip.models.WireFormat import WireFormat, FrameType, encode_state
+
+WS_SEND_SECONDS = metrics.histogram(
+    "smartstrip_ws_send_duration_seconds", "Websocket send latency by device", ("device_id",)
+)
+WS_SEND_FAILURES = metrics.counter(
+    "smartstrip_ws_send_failures_total", "Failed websocket sends by device", ("device_id",)
+)
+ACK_RTT_SECONDS = metrics.histogram(
+    "smartstrip_device_ack_rtt_seconds", "Time from sending a state frame to the strip ack", ("device_id",)
+)
+
+
+class DeviceOutbox:
+    def __init__(self, device: Device,
+                 on_unhealthy: Callable[[Device], None] | None = None,
+                 max_frames: int = app_config.device_outbox_size,
+                 send_timeout: float = app_config.device_send_timeout):
+        self.device = device
+        self.on_unhealthy = on_unhealthy
+        self.max_frames = max_frames
+        self.send_timeout = send_timeout
+        self.healthy = True
+
+        # Серии метрик ленты получаем один раз; при отключении они удаляются, чтобы не копиться по всем лентам
+        self._send_seconds = WS_SEND_SECONDS.labels(device.id)
+        self._send_failures = WS_SEND_FAILURES.labels(device.id)
+        self._ack_rtt = ACK_RTT_SECONDS.labels(device.id)
+
+        # Отправленные, но еще не подтвержденные кадры состояния: (seq, момент отправки, ожидающие ack)
+        self._unacked: deque[tuple[int, float, list[asyncio.Future]]] = deque()
+        self.acked_seq = 0
+        self.last_ack_rtt: float | None = None
+
+        # Служебные кадры отправляются по порядку, а состояние — одним последним кадром
+        self._frames: deque[str | bytes] = deque()
+        self._state_pending = False
+        self._waiters: list[asyncio.Future] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _ensure_writer(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    # Ставим отправку текущего состояния; future завершится, когда лента получит это или более новое состояние,
+    # а для ленты с подтверждениями — когда она пришлет ack
+    def push_state(self) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+
+        if not self.healthy:
+            future.set_result(False)
+            return future
+
+        self._state_pending = True
+        self._waiters.append(future)
+        self._ensure_writer()
+        self._wakeup.set()
+        return future
+
+    # Служебный кадр; при переполнении очереди кадр отбрасывается
+    def push_frame(self, data: str | bytes) -> bool:
+        if not self.healthy or len(self._frames) >= self.max_frames:
+            return False
+
+        self._frames.append(data)
+        self._ensure_writer()
+        self._wakeup.set()
+        return True
+
+    def pending(self) -> int:
+        return len(self._frames) + (1 if self._state_pending else 0)
+
+    async def _send(self, data: str | bytes) -> bool:
+        connection = self.device.connection
+        started = time.perf_counter()
+
+        try:
+            if isinstance(data, bytes):
+                await asyncio.wait_for(connection.send_bytes(data), self.send_timeout)
+            else:
+                await asyncio.wait_for(connection.send_text(data), self.send_timeout)
+            self._send_seconds.observe(time.perf_counter() - started)
+            return True
+        except (asyncio.TimeoutError, WebSocketDisconnect, RuntimeError) as e:
+            logger.debug("Send to %s failed: %r", self.device.id, e)
+            self._send_failures.inc()
+            self.mark_unhealthy()
+            return False
+
+    # Возвращает seq отправленного кадра, 0 — если отправлять нечего, None — если отправка не удалась
+    async def _send_state(self) -> int | None:
+        # Дельты только в протоколе версии 2; бинарный кадр и кадр исходного протокола несут полное состояние
+        wire_format = self.device.wire_format
+        frame = self.device.build_state_frame(full=wire_format != WireFormat.JSON_DELTA)
+        if frame is None:
+            return 0
+
+        if wire_format == WireFormat.BINARY:
+            data = encode_state(FrameType.STATE, frame["seq"], frame["full"])
+        else:
+            # Исходный протокол — голое состояние {"on": ..., "brightness": ...} без seq
+            data = json.dumps(frame if wire_format == WireFormat.JSON_DELTA else frame["full"], separators=(",", ":"))
+            log_device_debug(self.device.id, "Frame to %s: %s", self.device.id, data)
+
+        if not await self._send(data):
+            return None
+
+        self.device.confirm_state_frame(frame)
+        return frame["seq"]
+
+    # Запоминаем кадр до ack; самый старый неподтвержденный кадр вытесняется и считается не доставленным
+    def _expect_ack(self, seq: int, waiters: list[asyncio.Future]):
+        self._unacked.append((seq, time.perf_counter(), waiters))
+
+        if len(self._unacked) > self.max_frames:
+            _, _, dropped = self._unacked.popleft()
+            self._resolve(dropped, False)
+
+    # ack подтверждает кадр seq и все предыдущие
+    def on_ack(self, seq: int):
+        now = time.perf_counter()
+
+        while self._unacked and self._unacked[0][0] <= seq:
+            sent_seq, sent_at, waiters = self._unacked.popleft()
+
+            if sent_seq == seq:
+                self.last_ack_rtt = now - sent_at
+                self._ack_rtt.observe(self.last_ack_rtt)
+            self._resolve(waiters, True)
+
+        self.acked_seq = max(self.acked_seq, seq)
+
+    @staticmethod
+    def _resolve(waiters: list[asyncio.Future], result: bool):
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    async def _flush(self):
+        while self._frames and self.healthy:
+            await self._send(self._frames.popleft())
+
+        if self._state_pending and self.healthy:
+            self._state_pending = False
+            waiters, self._waiters = self._waiters, []
+
+            try:
+                seq = await self._send_state()
+            except Exception:
+                self._resolve(waiters, False)
+                raise
+
+            if seq:
+                # Время до ack меряем для всех лент, а ждать его заставляем только ленты с подтверждениями
+                self._expect_ack(seq, waiters if self.device.acks else [])
+                if not self.device.acks:
+                    self._resolve(waiters, True)
+            elif seq == 0 and self.device.acks and self._unacked:
+                # Состояние не изменилось, но последний кадр с ним лента еще не подтвердила
+                self._unacked[-1][2].extend(waiters)
+            else:
+                self._resolve(waiters, seq is not None)
+
+    async def _run(self):
+        try:
+            while self.healthy:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+
+                try:
+                    await self._flush()
+                except Exception:
+                    # Кадр не собрался или не закодировался: что получила лента, неизвестно, поэтому переподключаем ее
+                    logger.exception("Outbox of %s failed", self.device.id)
+                    self.mark_unhealthy()
+        finally:
+            # Завершенная задача не должна мешать _ensure_writer запустить новую
+            if self._task is asyncio.current_task():
+                self._task = None
+            self._fail_pending()
+
+    def _fail_pending(self):
+        self._frames.clear()
+        self._state_pending = False
+        waiters, self._waiters = self._waiters, []
+        self._resolve(waiters, False)
+
+        while self._unacked:
+            self._resolve(self._unacked.popleft()[2], False)
+
+    # Лента не принимает данные — закрываем соединение и убираем ее из реестра
+    def mark_unhealthy(self):
+        if not self.healthy:
+            return
+
+        self.healthy = False
+        asyncio.create_task(self._close_connection())
+
+        if self.on_unhealthy:
+            self.on_unhealthy(self.device)
+
+    async def _close_connection(self):
+        try:
+            await self.device.connection.close()
+        except Exception:
+            pass
+
+    def stop(self):
+        self.healthy = False
+
+        WS_SEND_SECONDS.remove(self.device.id)
+        WS_SEND_FAILURES.remove(self.device.id)
+        ACK_RTT_SECONDS.remove(self.device.id)
+
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+        else:
+            self._fail_pending()
@@ -1,46 +1,126 @@
-from fastapi import WebSocketDisconnect
+import asyncio
 
-from app.general.utils.logger import logger
-from app.pkg_smart_strip.models.Device import SmartStripDevice
+from app.general.utils.metrics import metrics
+from app.pkg_smart_strip.models.Device import SmartStripDevice, SmartStripStatePatch
+from app.pkg_smart_strip.models.DeviceOutbox import DeviceOutbox
+from app.pkg_smart_strip.models.StateStore import state_store
 
 
 class DeviceRegistry:
-    devices: list[SmartStripDevice] = list()
+    devices: dict[str, SmartStripDevice] = dict()
+    # Группа -> id устройств группы
+    groups: dict[str, set[str]] = dict()
+    # Готовые JSON-фрагменты описаний устройств для ответа на запрос списка устройств
+    discovery: dict[str, bytes] = dict()
+    _discovery_payload: bytes | None = None
 
+    # При переподключении ленты новая запись заменяет старую
     def add_device(self, device: SmartStripDevice):
-        self.devices.append(device)
+        previous = self.devices.get(device.id)
+        if previous is not None and previous is not device:
+            self._detach(previous)
+
+        device.attach_outbox(DeviceOutbox(device, on_unhealthy=self.remove_device))
+        self.devices[device.id] = device
+        self._set_discovery(device)
+
+        for group in device.groups:
+            self.groups.setdefault(group, set()).add(device.id)
+
+    # Описание пересобирается, только если изменилось
+    def _set_discovery(self, device: SmartStripDevice):
+        fragment = device.discovery_json()
+
+        if self.discovery.get(device.id) != fragment:
+            self.discovery[device.id] = fragment
+            self._discovery_payload = None
+
+    def _drop_discovery(self, device_id: str):
+        if self.discovery.pop(device_id, None) is not None:
+            self._discovery_payload = None
+
+    # Список описаний всех устройств через запятую, собирается заново только после изменения набора устройств
+    def get_discovery_payload(self) -> bytes:
+        if self._discovery_payload is None:
+            self._discovery_payload = b",".join(self.discovery.values())
+        return self._discovery_payload
 
     def get_device_by_id(self, device_id: str) -> SmartStripDevice | None:
-        return next((device for device in self.devices if device.id == device_id), None)
+        return self.devices.get(device_id)
 
     def get_devices(self) -> list[str]:
-        return [device.id for device in self.devices]
+        return list(self.devices)
+
+    def values(self) -> list[SmartStripDevice]:
+        return list(self.devices.values())
+
+    def get_devices_by_group(self, group: str) -> list[SmartStripDevice]:
+        return [self.devices[device_id] for device_id in self.groups.get(group, ())]
 
-    def remove_device(self, device):
-        if device in self.devices:
-            self.devices.remove(device)
+    # Удаляем только тот же экземпляр, чтобы отключение старого сокета не удалило новое подключение
+    def remove_device(self, device: SmartStripDevice):
+        if self.devices.get(device.id) is device:
+            del self.devices[device.id]
+            self._drop_discovery(device.id)
+            self._detach(device)
 
     def remove_device_by_id(self, device_id: str):
-        device = self.get_device_by_id(device_id)
+        device = self.devices.pop(device_id, None)
 
         if device:
-            self.devices.remove(device)
+            self._drop_discovery(device_id)
+            self._detach(device)
+
+    # Останавливаем очередь отправки и убираем ленту из групп; при переподключении группы добавятся заново
+    def _detach(self, device: SmartStripDevice):
+        if device.outbox:
+            device.outbox.stop()
+
+        for group in device.groups:
+            members = self.groups.get(group)
+            if members is not None:
+                members.discard(device.id)
+                if not members:
+                    del self.groups[group]
 
     def init_test_device(self, device_id="test"):
         device = SmartStripDevice(device_id)
         self.add_device(device)
 
-    async def update_device_state(self, device: str | SmartStripDevice):
+    # Ставит отправку состояния в очередь устройства и сразу возвращает future с результатом отправки
+    def update_device_state(self, device: str | SmartStripDevice) -> asyncio.Future:
         device = self.get_device_by_id(device) if isinstance(device, str) else device
 
-        if device:
-            request = device.state.model_dump_json()
-            logger.debug(request)
+        if not device or device.connection is None or device.outbox is None:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(False)
+            return future
+
+        state_store.save_device(device.id, device.state_dict())
+        return device.outbox.push_state()
 
-            try:
-                await device.connection.send_text(request)
-            except WebSocketDisconnect:
-                self.remove_device(device)
+    # Отчет ленты о собственном состоянии (кнопка, прошивка); True, если состояние изменилось.
+    # Некорректное состояние бросает pydantic.ValidationError
+    def apply_report(self, device: SmartStripDevice, seq: int | None, state: dict) -> bool:
+        patch = SmartStripStatePatch(**state)
+        if not device.accept_report(seq):
+            return False
+
+        before = device.state_dict()
+        patch.apply_to(device.state)
+        device.confirm_reported(patch.model_fields_set)
+
+        after = device.state_dict()
+        if after == before:
+            return False
+
+        state_store.save_device(device.id, after)
+        return True
 
 
 devices_registry = DeviceRegistry()
+
+metrics.gauge("smartstrip_connected_devices", "Strips connected to this worker",
+              fn=lambda: len(devices_registry.devices))
+metrics.gauge("smartstrip_device_outbox_depth", "Frames waiting in device outboxes",
+              fn=lambda: sum(device.outbox.pending() for device in devices_registry.devices.values() if device.outbox))
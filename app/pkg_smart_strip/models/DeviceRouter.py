@@ -0,0 +1,313 @@
+import asyncio
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote, unquote
+
+from app.general.utils.config import app_config
+from app.general.utils.logger import logger
+from app.pkg_smart_strip.models.Device import SmartStripStatePatch
+from app.pkg_smart_strip.models.DeviceRegistry import DeviceRegistry
+
+
+# Выполняем запрос другого воркера к ленте, подключенной к этому воркеру
+async def handle_request(registry: DeviceRegistry, request: dict[str, Any]) -> dict[str, Any]:
+    device = registry.get_device_by_id(request.get("device_id", ""))
+    if not device:
+        return {"found": False}
+
+    if request.get("op") == "apply":
+        SmartStripStatePatch(**request.get("state", {})).apply_to(device.state)
+
+        try:
+            sent = await asyncio.wait_for(
+                asyncio.shield(registry.update_device_state(device)),
+                timeout=app_config.device_send_timeout
+            )
+        except asyncio.TimeoutError:
+            sent = False
+
+        return {"found": True, "sent": sent, "state": device.state_dict()}
+
+    return {"found": True, "state": device.state_dict()}
+
+
+# Маршрутизация в пределах одного процесса: все ленты локальные
+class DeviceRouter:
+    async def start(self, registry: DeviceRegistry):
+        pass
+
+    async def stop(self):
+        pass
+
+    # Вместе с владельцем публикуются группы ленты, чтобы массовая команда на группу нашла ее с любого воркера
+    def publish(self, device_id: str, groups: frozenset[str] = frozenset()):
+        pass
+
+    def unpublish(self, device_id: str):
+        pass
+
+    async def request(self, device_id: str, request: dict[str, Any]) -> dict[str, Any] | None:
+        return None
+
+    async def list_devices(self) -> list[str]:
+        return []
+
+    async def list_group(self, group: str) -> list[str]:
+        return []
+
+    # Применить состояние к ленте другого воркера: None — ленты нет нигде, иначе результат отправки
+    async def forward(self, device_id: str, patch: SmartStripStatePatch) -> bool | None:
+        reply = await self.request(device_id, {
+            "op": "apply",
+            "device_id": device_id,
+            "state": patch.model_dump(mode="json", exclude_unset=True)
+        })
+        return reply["sent"] if reply and reply.get("found") else None
+
+    async def get_state(self, device_id: str) -> dict[str, Any] | None:
+        reply = await self.request(device_id, {"op": "get", "device_id": device_id})
+        return reply["state"] if reply and reply.get("found") else None
+
+
+# Воркеры одной машины: владельцы лент хранятся файлами в общем каталоге, запросы идут через Unix-сокеты.
+# Файл владельца — JSON с путем сокета воркера и группами ленты
+class UnixSocketRouter(DeviceRouter):
+    def __init__(self, run_dir: str = app_config.device_router_dir):
+        self.owners_dir = Path(run_dir) / "owners"
+        self.sockets_dir = Path(run_dir) / "workers"
+        self.socket_path = str(self.sockets_dir / f"{os.getpid()}.sock")
+        self._server: asyncio.AbstractServer | None = None
+        self._registry: DeviceRegistry | None = None
+
+    def _owner_file(self, device_id: str) -> Path:
+        return self.owners_dir / quote(device_id, safe="")
+
+    # Файл могли удалить между listdir и чтением
+    @staticmethod
+    def _read_owner(owner_file: Path) -> dict[str, Any] | None:
+        try:
+            return json.loads(owner_file.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    async def start(self, registry: DeviceRegistry):
+        self._registry = registry
+        self.owners_dir.mkdir(parents=True, exist_ok=True)
+        self.sockets_dir.mkdir(parents=True, exist_ok=True)
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._server = await asyncio.start_unix_server(self._serve, path=self.socket_path)
+        logger.debug("Device router listening on %s", self.socket_path)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        for device_id in self._registry.get_devices() if self._registry else []:
+            self.unpublish(device_id)
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                reply = await handle_request(self._registry, json.loads(line))
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except Exception as e:
+            logger.error("Device router connection failed: %r", e)
+        finally:
+            writer.close()
+
+    # Запись через временный файл и os.replace атомарна, читатель не увидит половину пути
+    def publish(self, device_id: str, groups: frozenset[str] = frozenset()):
+        owner_file = self._owner_file(device_id)
+        tmp_file = owner_file.with_name(f".{owner_file.name}.{os.getpid()}")
+        tmp_file.write_text(json.dumps({"owner": self.socket_path, "groups": sorted(groups)}))
+        os.replace(tmp_file, owner_file)
+
+    # Не удаляем запись, если лента уже переподключилась к другому воркеру
+    def unpublish(self, device_id: str):
+        owner_file = self._owner_file(device_id)
+        record = self._read_owner(owner_file)
+
+        if record and record["owner"] == self.socket_path:
+            owner_file.unlink(missing_ok=True)
+
+    async def request(self, device_id: str, request: dict[str, Any]) -> dict[str, Any] | None:
+        owner_file = self._owner_file(device_id)
+        record = self._read_owner(owner_file)
+
+        if record is None or record["owner"] == self.socket_path:
+            return None
+
+        owner = record["owner"]
+
+        try:
+            reader, writer = await asyncio.open_unix_connection(owner)
+        except (ConnectionError, FileNotFoundError):
+            # Воркер-владелец умер, запись устарела
+            logger.debug("Owner of %s is gone, dropping %s", device_id, owner)
+            owner_file.unlink(missing_ok=True)
+            return None
+
+        try:
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), timeout=app_config.device_send_timeout + 1)
+            return json.loads(line) if line else None
+        except (ConnectionError, asyncio.TimeoutError, ValueError) as e:
+            logger.debug("Request to owner of %s failed: %r", device_id, e)
+            return None
+        finally:
+            writer.close()
+
+    async def list_devices(self) -> list[str]:
+        return [unquote(name) for name in os.listdir(self.owners_dir) if not name.startswith(".")]
+
+    async def list_group(self, group: str) -> list[str]:
+        members = []
+
+        for name in os.listdir(self.owners_dir):
+            if name.startswith("."):
+                continue
+
+            record = self._read_owner(self.owners_dir / name)
+            if record and group in record["groups"]:
+                members.append(unquote(name))
+        return members
+
+
+# Воркеры на одной или нескольких машинах через Redis: владельцы в хеше, запросы через pub/sub.
+# Значение в хеше — JSON с id воркера и группами ленты
+class RedisRouter(DeviceRouter):
+    OWNERS_KEY = "smartstrip:owners"
+    CHANNEL_PREFIX = "smartstrip:worker:"
+
+    def __init__(self, url: str = app_config.redis_url):
+        self.url = url
+        self.worker_id = uuid.uuid4().hex
+        self.channel = f"{self.CHANNEL_PREFIX}{self.worker_id}"
+        self._redis = None
+        self._pubsub = None
+        self._listener: asyncio.Task | None = None
+        self._registry: DeviceRegistry | None = None
+        self._pending: dict[str, asyncio.Future] = dict()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self, registry: DeviceRegistry):
+        # redis — необязательная зависимость, нужна только для этого роутера
+        import redis.asyncio as redis
+
+        self._registry = registry
+        self._redis = redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+
+        if self._registry and self._registry.get_devices():
+            await self._redis.hdel(self.OWNERS_KEY, *self._registry.get_devices())
+
+        if self._pubsub:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.aclose()
+        if self._redis:
+            await self._redis.aclose()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+
+            try:
+                payload = json.loads(message["data"])
+            except ValueError:
+                continue
+
+            if "reply_to" in payload:
+                self._spawn(self._answer(payload))
+            else:
+                future = self._pending.pop(payload.get("id"), None)
+                if future and not future.done():
+                    future.set_result(payload["reply"])
+
+    async def _answer(self, payload: dict[str, Any]):
+        reply = await handle_request(self._registry, payload["request"])
+        await self._redis.publish(payload["reply_to"], json.dumps({"id": payload["id"], "reply": reply}))
+
+    def publish(self, device_id: str, groups: frozenset[str] = frozenset()):
+        record = json.dumps({"worker": self.worker_id, "groups": sorted(groups)})
+        self._spawn(self._redis.hset(self.OWNERS_KEY, device_id, record))
+
+    def unpublish(self, device_id: str):
+        # Удаляем запись, только если ей все еще владеет этот воркер
+        script = (
+            "local record = redis.call('hget', KEYS[1], ARGV[1]) "
+            "if record and cjson.decode(record)['worker'] == ARGV[2] then return redis.call('hdel', KEYS[1], ARGV[1]) end "
+            "return 0"
+        )
+        self._spawn(self._redis.eval(script, 1, self.OWNERS_KEY, device_id, self.worker_id))
+
+    async def request(self, device_id: str, request: dict[str, Any]) -> dict[str, Any] | None:
+        record = await self._redis.hget(self.OWNERS_KEY, device_id)
+        if record is None:
+            return None
+
+        owner = json.loads(record)["worker"]
+        if owner == self.worker_id:
+            return None
+
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        try:
+            receivers = await self._redis.publish(f"{self.CHANNEL_PREFIX}{owner}", json.dumps({
+                "id": request_id,
+                "reply_to": self.channel,
+                "request": request
+            }))
+            if not receivers:
+                return None
+
+            return await asyncio.wait_for(future, timeout=app_config.device_send_timeout + 1)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def list_devices(self) -> list[str]:
+        return [device_id.decode() for device_id in await self._redis.hkeys(self.OWNERS_KEY)]
+
+    async def list_group(self, group: str) -> list[str]:
+        owners = await self._redis.hgetall(self.OWNERS_KEY)
+        return [device_id.decode() for device_id, record in owners.items() if group in json.loads(record)["groups"]]
+
+
+def create_router(kind: str = app_config.device_router) -> DeviceRouter:
+    if kind == "unix":
+        return UnixSocketRouter()
+    if kind == "redis":
+        return RedisRouter()
+    return DeviceRouter()
+
+
+device_router = create_router()
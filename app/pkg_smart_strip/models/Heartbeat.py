@@ -0,0 +1,118 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+
+from app.general.utils.config import app_config
+from app.general.utils.logger import logger
+from app.general.utils.metrics import metrics
+from app.pkg_smart_strip.models.Device import SmartStripDevice
+from app.pkg_smart_strip.models.DeviceRegistry import DeviceRegistry, devices_registry
+from app.pkg_smart_strip.models.WireFormat import WireFormat, FrameType, encode_header
+
+PING_JSON = json.dumps({"type": "ping"}, separators=(",", ":"))
+PING_BINARY = encode_header(FrameType.PING)
+
+HEARTBEAT_PINGS = metrics.counter("smartstrip_heartbeat_pings_total", "Heartbeat pings sent to strips").labels()
+HEARTBEAT_REAPED = metrics.counter(
+    "smartstrip_heartbeat_reaped_total", "Strips dropped for not answering heartbeats"
+).labels()
+
+
+# Один таймер на все ленты: куча (срок проверки, порядковый номер, лента)
+class HeartbeatScheduler:
+    def __init__(self, registry: DeviceRegistry,
+                 interval: float = app_config.heartbeat_interval,
+                 timeout: float = app_config.heartbeat_timeout):
+        self.registry = registry
+        self.interval = interval
+        self.timeout = timeout
+        self._heap: list[tuple[float, int, SmartStripDevice]] = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def _schedule(self, device: SmartStripDevice, due: float):
+        heapq.heappush(self._heap, (due, next(self._counter), device))
+
+    # Новая запись не может оказаться раньше существующих: у всех один интервал.
+    # Следим только за лентами, подключившимися с ?heartbeat=1: старые прошивки ping не знают
+    def watch(self, device: SmartStripDevice):
+        if not self.enabled or not device.heartbeat:
+            return
+
+        device.touch()
+        self._schedule(device, device.last_seen + self.interval)
+        self._wakeup.set()
+
+    # Лента молчит дольше таймаута: соединение, скорее всего, полуоткрыто
+    def is_stale(self, device: SmartStripDevice) -> bool:
+        return self.enabled and device.heartbeat and time.monotonic() - device.last_seen >= self.timeout
+
+    def _check(self, device: SmartStripDevice, now: float):
+        # Лента отключилась или переподключилась новым экземпляром — запись устарела
+        if self.registry.get_device_by_id(device.id) is not device or device.outbox is None or not device.outbox.healthy:
+            return
+
+        idle = now - device.last_seen
+
+        if idle >= self.timeout:
+            logger.debug("Strip %s is silent for %.1fs, dropping it", device.id, idle)
+            HEARTBEAT_REAPED.inc()
+            device.outbox.mark_unhealthy()
+            return
+
+        # Пингуем только ленты, от которых ничего не было весь интервал
+        if idle >= self.interval:
+            ping = PING_BINARY if device.wire_format == WireFormat.BINARY else PING_JSON
+            if device.outbox.push_frame(ping):
+                HEARTBEAT_PINGS.inc()
+            self._schedule(device, now + min(self.interval, self.timeout - idle))
+        else:
+            self._schedule(device, device.last_seen + self.interval)
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, device = heapq.heappop(self._heap)
+
+            # Ошибка на одной ленте не должна останавливать таймер остальных
+            try:
+                self._check(device, time.monotonic())
+            except Exception as e:
+                logger.error("Heartbeat check of %s failed: %r", device.id, e)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        self._heap.clear()
+
+
+heartbeat = HeartbeatScheduler(devices_registry)
+
+metrics.gauge("smartstrip_heartbeat_scheduled", "Strips waiting for a heartbeat check", fn=lambda: len(heartbeat._heap))
@@ -0,0 +1,190 @@
+import asyncio
+import time
+
+import httpx
+
+from app.general.utils.config import app_config
+from app.general.utils.http_client import http_client
+from app.general.utils.logger import logger
+from app.general.utils.metrics import metrics
+from app.pkg_smart_strip.models.Capabilities import query_capabilities
+from app.pkg_smart_strip.models.Device import SmartStripDevice, SmartStripState
+from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.DeviceRouter import device_router
+from app.pkg_smart_strip.models.StateStore import state_store
+from app.pkg_smart_strip.models.UserRegistry import users_cache
+
+NOTIFY_BATCH_SIZE = metrics.histogram(
+    "smartstrip_notify_batch_devices", "Devices per Yandex state callback", buckets=(1, 2, 5, 10, 20, 50, 100, 200)
+).labels()
+NOTIFY_REQUEST_SECONDS = metrics.histogram(
+    "smartstrip_notify_request_duration_seconds", "Yandex state callback latency"
+).labels()
+NOTIFY_RESULTS = metrics.counter(
+    "smartstrip_notify_callbacks_total", "Yandex state callbacks by result", ("result",)
+)
+NOTIFY_SENT = NOTIFY_RESULTS.labels("sent")
+NOTIFY_RETRIED = NOTIFY_RESULTS.labels("retried")
+NOTIFY_FAILED = NOTIFY_RESULTS.labels("failed")
+
+
+class PendingNotification:
+    __slots__ = ("first_change", "last_change", "device_ids")
+
+    def __init__(self, now: float):
+        self.first_change = now
+        self.last_change = now
+        self.device_ids: set[str] = set()
+
+
+# Уведомляет Яндекс об изменениях состояния, сделанных не через действия умного дома
+class CallbackNotifier:
+    def __init__(self, skill_id: str = app_config.yandex_skill_id,
+                 token: str = app_config.yandex_skill_token,
+                 url: str = app_config.yandex_callback_url,
+                 debounce: float = app_config.notify_debounce,
+                 max_delay: float = app_config.notify_max_delay,
+                 retries: int = app_config.notify_retries,
+                 backoff: float = app_config.notify_backoff):
+        self.url = url.format(skill_id=skill_id)
+        self.enabled = bool(skill_id and token)
+        self.headers = {"Authorization": f"OAuth {token}"}
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.retries = retries
+        self.backoff = backoff
+
+        # user_id -> накопленные изменения, которые еще не отправлены
+        self._pending: dict[str, PendingNotification] = dict()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._sending: set[asyncio.Task] = set()
+
+    # Серия изменений (например, движение слайдера) уходит одним запросом после паузы, но не позже max_delay
+    def _due(self, pending: PendingNotification) -> float:
+        return min(pending.last_change + self.debounce, pending.first_change + self.max_delay)
+
+    # Все ленты видны всем привязанным пользователям, поэтому изменение попадает каждому из них
+    def device_changed(self, device_id: str):
+        if not self.enabled:
+            return
+
+        now = time.monotonic()
+
+        for user_id in users_cache.tokens:
+            pending = self._pending.get(user_id)
+            if pending is None:
+                pending = self._pending[user_id] = PendingNotification(now)
+
+            pending.last_change = now
+            pending.device_ids.add(device_id)
+
+        self._wakeup.set()
+
+    async def _collect_devices(self, device_ids: set[str]) -> list[dict]:
+        devices = []
+
+        for device_id in device_ids:
+            device = devices_registry.get_device_by_id(device_id)
+
+            # Лента могла переехать на другой воркер или отключиться уже после изменения
+            if device is None:
+                state = await device_router.get_state(device_id) or state_store.get_device_state(device_id)
+                if state is None:
+                    continue
+
+                device = SmartStripDevice(device_id)
+                device.state = SmartStripState(**state)
+
+            devices.append({"id": device_id, "capabilities": query_capabilities(device)})
+        return devices
+
+    async def _send(self, user_id: str, device_ids: set[str]):
+        devices = await self._collect_devices(device_ids)
+        if not devices:
+            return
+
+        NOTIFY_BATCH_SIZE.observe(len(devices))
+        body = {"ts": time.time(), "payload": {"user_id": user_id, "devices": devices}}
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                NOTIFY_RETRIED.inc()
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+            started = time.perf_counter()
+            try:
+                response = await http_client.client.post(self.url, json=body, headers=self.headers)
+            except httpx.HTTPError as e:
+                error = repr(e)
+                continue
+            finally:
+                NOTIFY_REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+            if response.is_success:
+                NOTIFY_SENT.inc()
+                return
+
+            error = f"HTTP {response.status_code}: {response.text}"
+
+            # Повтор не поможет: запрос или токен навыка неверны
+            if response.is_client_error and response.status_code != 429:
+                break
+
+        NOTIFY_FAILED.inc()
+        logger.error("State callback for user %s failed: %s", user_id, error)
+
+    def _spawn(self, user_id: str, pending: PendingNotification):
+        task = asyncio.create_task(self._send(user_id, pending.device_ids))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            due = [user_id for user_id, pending in self._pending.items() if self._due(pending) <= now]
+
+            for user_id in due:
+                self._spawn(user_id, self._pending.pop(user_id))
+
+            if self._pending:
+                self._wakeup.clear()
+                timeout = min(self._due(pending) for pending in self._pending.values()) - now
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    # Отправляем все накопленное, не дожидаясь окончания паузы
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        pending, self._pending = self._pending, dict()
+        for user_id, notification in pending.items():
+            self._spawn(user_id, notification)
+
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+
+notifier = CallbackNotifier()
+
+metrics.gauge("smartstrip_notify_pending_users", "Users with state changes waiting to be sent to Yandex",
+              fn=lambda: len(notifier._pending))
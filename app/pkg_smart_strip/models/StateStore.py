@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from app.general.utils.config import app_config
+from app.general.utils.logger import logger
+from app.general.utils.metrics import metrics
+
+
+class StateStore:
+    def __init__(self, path: str = app_config.state_store_path,
+                 flush_interval: float = app_config.state_store_flush_interval):
+        self.path = path
+        self.flush_interval = flush_interval
+
+        # Последнее известное состояние лент, в том числе отключенных
+        self.device_states: dict[str, dict[str, Any]] = dict()
+
+        # Изменения, еще не записанные на диск; None у пользователя означает удаление
+        self._dirty_devices: dict[str, dict[str, Any]] = dict()
+        self._dirty_users: dict[str, dict[str, Any] | None] = dict()
+
+        self._db: sqlite3.Connection | None = None
+        # Один поток: sqlite-соединение используется только из него
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-store")
+        self._flusher: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _open(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        # В базе лежат токены пользователей
+        os.chmod(self.path, 0o600)
+
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS devices (id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self._db.commit()
+
+    def _read(self) -> tuple[dict[str, dict[str, Any]], list[dict[str, Any]]]:
+        devices = {device_id: json.loads(state) for device_id, state in self._db.execute("SELECT id, state FROM devices")}
+        users = [json.loads(data) for data, in self._db.execute("SELECT data FROM users")]
+        return devices, users
+
+    def _write(self, devices: dict[str, dict[str, Any]], users: dict[str, dict[str, Any] | None]):
+        now = time.time()
+
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO devices (id, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                [(device_id, json.dumps(state), now) for device_id, state in devices.items()]
+            )
+            self._db.executemany(
+                "INSERT INTO users (user_id, data) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+                [(user_id, json.dumps(data)) for user_id, data in users.items() if data is not None]
+            )
+            self._db.executemany(
+                "DELETE FROM users WHERE user_id = ?",
+                [(user_id,) for user_id, data in users.items() if data is None]
+            )
+
+    # Открываем базу и читаем все одним проходом; возвращаем сохраненных пользователей
+    async def load(self) -> list[dict[str, Any]]:
+        if not self.enabled:
+            return []
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._open)
+        devices, users = await loop.run_in_executor(self._executor, self._read)
+
+        self.device_states.update(devices)
+        logger.debug("Loaded %d device states and %d users from %s", len(devices), len(users), self.path)
+        return users
+
+    def get_device_state(self, device_id: str) -> dict[str, Any] | None:
+        return self.device_states.get(device_id)
+
+    def save_device(self, device_id: str, state: dict[str, Any]):
+        self.device_states[device_id] = state
+        if self.enabled:
+            self._dirty_devices[device_id] = state
+
+    def save_user(self, user_id: str, data: dict[str, Any]):
+        if self.enabled:
+            self._dirty_users[user_id] = data
+
+    def delete_user(self, user_id: str):
+        if self.enabled:
+            self._dirty_users[user_id] = None
+
+    async def flush(self):
+        if self._db is None or not (self._dirty_devices or self._dirty_users):
+            return
+
+        devices, self._dirty_devices = self._dirty_devices, dict()
+        users, self._dirty_users = self._dirty_users, dict()
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write, devices, users)
+        except sqlite3.Error as e:
+            logger.error("Failed to persist state to %s: %s", self.path, e)
+
+            # Вернем несохраненное, не затирая более свежие изменения
+            self._dirty_devices = {**devices, **self._dirty_devices}
+            self._dirty_users = {**users, **self._dirty_users}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self.enabled and self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+
+        if self._db is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._db.close)
+            self._db = None
+
+
+state_store = StateStore()
+
+metrics.gauge("smartstrip_state_store_pending", "Device states and users waiting to be written to disk",
+              fn=lambda: len(state_store._dirty_devices) + len(state_store._dirty_users))
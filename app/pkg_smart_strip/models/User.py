@@ -1,10 +1,20 @@
+import time
 from datetime import datetime, timezone, timedelta
 
-import httpx
 from fastapi import status
 from pydantic import BaseModel
 
-YANDEX_TOKEN_URL = "https://oauth.yandex.ru/token"
+from app.general.utils.config import app_config
+from app.general.utils.http_client import http_client
+from app.general.utils.logger import logger
+from app.general.utils.metrics import metrics
+
+YANDEX_TOKEN_URL = app_config.yandex_token_url
+
+YANDEX_REQUEST_SECONDS = metrics.histogram(
+    "smartstrip_yandex_request_duration_seconds", "Yandex OAuth upstream latency", ("endpoint",)
+)
+TOKEN_REQUEST_SECONDS = YANDEX_REQUEST_SECONDS.labels("token")
 
 
 class User(BaseModel):
@@ -37,13 +47,17 @@ class User(BaseModel):
             "client_secret": client_secret,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(YANDEX_TOKEN_URL, data=data)
-            if response.status_code == status.HTTP_200_OK:
-                token_data = response.json()
-                self.access_token = token_data["access_token"]
-                self.expires_at = datetime.now(timezone.utc) + timedelta(seconds=token_data["expires_in"])
-                self.refresh_token = token_data.get("refresh_token", self.refresh_token)
-                return True
-            else:
-                raise Exception(f"Error refreshing token: {response.text}")
+        started = time.perf_counter()
+        response = await http_client.client.post(YANDEX_TOKEN_URL, data=data)
+        TOKEN_REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+        if response.status_code == status.HTTP_200_OK:
+            token_data = response.json()
+            self.access_token = token_data["access_token"]
+            self.expires_at = datetime.now(timezone.utc) + timedelta(seconds=token_data["expires_in"])
+            self.refresh_token = token_data.get("refresh_token", self.refresh_token)
+            return True
+
+        # Отказ Яндекса (например, invalid_grant): токен придется проверить заново через userinfo
+        logger.debug("Token refresh for %s failed: %s %s", self.user_id, response.status_code, response.text)
+        return False
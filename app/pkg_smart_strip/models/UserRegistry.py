@@ -1,32 +1,111 @@
+import asyncio
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 
+from app.general.utils.config import app_config
+from app.general.utils.logger import logger
+from app.general.utils.metrics import metrics
+from app.pkg_smart_strip.models.StateStore import state_store
 from app.pkg_smart_strip.models.User import User
 
 
 class UserRegistry:
-    users: list[User] = list()
+    # access_token -> User, порядок ключей используется для LRU-вытеснения
+    users: OrderedDict[str, User] = OrderedDict()
+    # user_id -> access_token, под которым пользователь сейчас проиндексирован
+    tokens: dict[str, str] = dict()
 
+    def __init__(self, max_size: int = app_config.users_cache_max_size,
+                 sweep_interval: int = app_config.users_cache_sweep_interval):
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self._sweeper: asyncio.Task | None = None
+
+    # Повторное добавление пользователя переиндексирует его по текущему токену (например, после refresh)
     def add_user(self, user: User):
-        self.users.append(user)
+        self._insert(user)
+        state_store.save_user(user.user_id, user.model_dump(mode="json"))
+
+    def _insert(self, user: User):
+        self._remove_by_id(user.user_id)
+
+        self.users[user.access_token] = user
+        self.tokens[user.user_id] = user.access_token
+
+        while len(self.users) > self.max_size:
+            _, evicted = self.users.popitem(last=False)
+            self.tokens.pop(evicted.user_id, None)
+            state_store.delete_user(evicted.user_id)
+
+    # Восстанавливаем пользователей, сохраненных до перезапуска, без повторной записи на диск
+    def restore(self, users: list[dict]):
+        for data in users:
+            user = User(**data)
+            if user.is_token_valid() or user.refresh_token:
+                self._insert(user)
+            else:
+                state_store.delete_user(user.user_id)
 
     def get_user_by_id(self, user_id: str) -> User | None:
-        return next((user for user in self.users if user.user_id == user_id), None)
+        token = self.tokens.get(user_id)
+        return self.users.get(token) if token else None
 
     def get_user_by_token(self, token: str) -> User | None:
-        return next((user for user in self.users if user.access_token == token), None)
+        user = self.users.get(token)
+
+        if user:
+            self.users.move_to_end(token)
+        return user
 
     def get_users(self) -> list[str]:
-        return [user.user_id for user in self.users]
+        return list(self.tokens)
 
-    def remove_user(self, user):
-        if user in self.users:
-            self.users.remove(user)
+    def remove_user(self, user: User):
+        if self.get_user_by_id(user.user_id) is user:
+            self._remove_by_id(user.user_id)
 
     def remove_user_by_id(self, user_id: str):
-        user = self.get_user_by_id(user_id)
+        self._remove_by_id(user_id)
 
-        if user:
-            self.users.remove(user)
+    def _remove_by_id(self, user_id: str):
+        token = self.tokens.pop(user_id, None)
+
+        if token:
+            self.users.pop(token, None)
+            state_store.delete_user(user_id)
+
+    # Удаляем пользователей с истекшим токеном, которые не могут его обновить
+    def remove_expired(self) -> int:
+        expired = [
+            user for user in self.users.values()
+            if not user.is_token_valid() and not user.refresh_token
+        ]
+
+        for user in expired:
+            self._remove_by_id(user.user_id)
+        return len(expired)
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.remove_expired()
+
+            if removed:
+                logger.debug("Removed %d expired users from cache", removed)
+
+    def start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop_sweeper(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
 
     def init_test_user(self, user_id: str = "000000000"):
         access_token: str = "token_id"
@@ -37,3 +116,5 @@ class UserRegistry:
 
 
 users_cache = UserRegistry()
+
+metrics.gauge("smartstrip_cached_users", "Users in the token cache", fn=lambda: len(users_cache.users))
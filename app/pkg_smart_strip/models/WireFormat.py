@@ -0,0 +1,86 @@
+import struct
+from enum import StrEnum
+from typing import Any
+
+from app.pkg_smart_strip.models.Device import DeviceMode
+
+BINARY_SUBPROTOCOL = "smartstrip.bin.v1"
+DELTA_SUBPROTOCOL = "smartstrip.json.v2"
+
+
+class WireFormat(StrEnum):
+    # Исходный протокол: каждый кадр — полное состояние без номера
+    JSON = "json"
+    # Версия 2: кадры с seq, после первого полного — только изменившиеся поля
+    JSON_DELTA = "json.v2"
+    BINARY = "binary"
+
+
+class FrameType:
+    STATE = 0x01
+    RESYNC = 0x02
+    REPORT = 0x03
+    PING = 0x04
+    PONG = 0x05
+    ACK = 0x06
+
+
+# Заголовок кадра: тип (uint8), seq (uint32)
+HEADER = struct.Struct("<BI")
+# Кадр состояния: заголовок, on (uint8), brightness (uint8), program (uint8), h (uint16), s (uint8), v (uint8)
+STATE_FRAME = struct.Struct("<BIBBBHBB")
+
+PROGRAMS: tuple[str, ...] = tuple(mode.value for mode in DeviceMode)
+PROGRAM_INDEX: dict[str, int] = {program: index for index, program in enumerate(PROGRAMS)}
+
+
+# Служебный кадр без состояния: только заголовок
+def encode_header(frame_type: int, seq: int = 0) -> bytes:
+    return HEADER.pack(frame_type, seq)
+
+
+# Поле вне диапазона бросает ValueError, а не struct.error с неясной причиной
+def _check_range(name: str, value: int, high: int):
+    if not 0 <= value <= high:
+        raise ValueError(f"{name}={value} is out of range 0..{high}")
+
+
+def encode_state(frame_type: int, seq: int, state: dict[str, Any]) -> bytes:
+    hsv = state["hsv"]
+    _check_range("brightness", state["brightness"], 100)
+    _check_range("h", hsv["h"], 360)
+    _check_range("s", hsv["s"], 100)
+    _check_range("v", hsv["v"], 100)
+
+    return STATE_FRAME.pack(
+        frame_type,
+        seq,
+        1 if state["on"] else 0,
+        state["brightness"],
+        PROGRAM_INDEX[state["program"]],
+        hsv["h"],
+        hsv["s"],
+        hsv["v"]
+    )
+
+
+# Разбираем кадр без копирования буфера; возвращаем (тип, seq, состояние или None)
+def decode_frame(data: bytes | bytearray | memoryview) -> tuple[int, int, dict[str, Any] | None]:
+    if len(data) < HEADER.size:
+        raise ValueError(f"Frame is too short: {len(data)} bytes")
+
+    if len(data) < STATE_FRAME.size:
+        frame_type, seq = HEADER.unpack_from(data)
+        return frame_type, seq, None
+
+    frame_type, seq, on, brightness, program, h, s, v = STATE_FRAME.unpack_from(data)
+
+    if program >= len(PROGRAMS):
+        raise ValueError(f"Unknown program index: {program}")
+
+    return frame_type, seq, {
+        "on": bool(on),
+        "brightness": brightness,
+        "program": PROGRAMS[program],
+        "hsv": {"h": h, "s": s, "v": v}
+    }
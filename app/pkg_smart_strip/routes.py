@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from app.pkg_smart_strip.api.commands import router as esp_router
+from app.pkg_smart_strip.api.commands_bulk import router as bulk_router
 from app.pkg_smart_strip.api.devices import router as devices_router
 from app.pkg_smart_strip.api.root import router as health_router
 from app.pkg_smart_strip.api.user_devices import router as device_router
@@ -18,6 +19,7 @@ router.include_router(device_action_router)
 router.include_router(health_router)
 router.include_router(unlink_router)
 router.include_router(esp_router)
+router.include_router(bulk_router)
 router.include_router(devices_router)
 router.include_router(users_router)
 router.include_router(websocket_router)
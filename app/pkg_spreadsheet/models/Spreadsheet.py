@@ -1,8 +1,25 @@
-import gspread
-from google.oauth2.service_account import Credentials
+import asyncio
+import threading
+import time
 from enum import StrEnum
+from typing import Any, TYPE_CHECKING
 
 from app.general.utils.config import app_config
+from app.general.utils.logger import logger
+from app.general.utils.metrics import metrics
+
+# gspread и google-auth тяжелые, импортируем их только при первом подключении
+if TYPE_CHECKING:
+    import gspread
+
+SHEETS_REQUEST_SECONDS = metrics.histogram(
+    "smartstrip_sheets_request_duration_seconds", "Google Sheets call latency", ("operation",)
+)
+SHEETS_REQUEST_FAILURES = metrics.counter(
+    "smartstrip_sheets_request_failures_total", "Failed Google Sheets calls", ("operation",)
+)
+APPEND_ROWS_SECONDS = SHEETS_REQUEST_SECONDS.labels("append_rows")
+APPEND_ROWS_FAILURES = SHEETS_REQUEST_FAILURES.labels("append_rows")
 
 
 class DocName(StrEnum):
@@ -23,33 +40,147 @@ class Title:
 
 
 class Spreadsheet:
-    def __init__(self, table: str = DocName.DATA):
-        scope = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
+    def __init__(self, table: str = DocName.DATA, cache_ttl: float = app_config.sheets_cache_ttl):
+        self.table = table
+        self.client = None
+        self._spreadsheet = None
+        self._lock = threading.Lock()
+        self._warm_up: asyncio.Task | None = None
 
-        creds = Credentials.from_service_account_file(app_config.file_gcp_sheets_key, scopes=scope)
-        self.client = gspread.authorize(creds)
-        self.spreadsheet = self.client.open(table)
+        # Кеш листов и заголовков: page -> (момент загрузки, значение)
+        self.cache_ttl = cache_ttl
+        self.worksheets: dict[str, tuple[float, "gspread.Worksheet"]] = dict()
+        self.titles: dict[str, tuple[float, list[Title]]] = dict()
 
 
-    def update_cell(self, page, row, col, value):
+    @property
+    def is_connected(self) -> bool:
+        return self._spreadsheet is not None
+
+
+    # Подключаемся к таблице при первом обращении; при ошибке следующее обращение попробует снова
+    def connect(self):
+        with self._lock:
+            if self._spreadsheet is not None:
+                return
+
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            scope = [
+                'https://www.googleapis.com/auth/spreadsheets',
+                'https://www.googleapis.com/auth/drive'
+            ]
+
+            creds = Credentials.from_service_account_file(app_config.file_gcp_sheets_key, scopes=scope)
+            self.client = gspread.authorize(creds)
+            self._spreadsheet = self.client.open(self.table)
+
+
+    @property
+    def spreadsheet(self):
+        if self._spreadsheet is None:
+            self.connect()
+        return self._spreadsheet
+
+
+    async def _connect_in_background(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.connect)
+            logger.debug("Spreadsheet %s connected", self.table)
+        except Exception as e:
+            logger.error("Spreadsheet %s is unavailable: %s", self.table, e)
+
+
+    # Прогрев подключения, не блокирующий запуск приложения
+    def start_warm_up(self):
+        if self._warm_up is None and not self.is_connected:
+            self._warm_up = asyncio.create_task(self._connect_in_background())
+
+
+    def _is_fresh(self, loaded_at: float) -> bool:
+        return time.monotonic() - loaded_at < self.cache_ttl
+
+
+    # Сбрасываем кеш одного листа или всех листов
+    def refresh(self, page: str | None = None):
+        if page is None:
+            self.worksheets.clear()
+            self.titles.clear()
+        else:
+            self.worksheets.pop(page, None)
+            self.titles.pop(page, None)
+
+
+    def get_worksheet(self, page: str) -> "gspread.Worksheet":
+        cached = self.worksheets.get(page)
+        if cached and self._is_fresh(cached[0]):
+            return cached[1]
+
         worksheet = self.spreadsheet.worksheet(page)
+        self.worksheets[page] = (time.monotonic(), worksheet)
+        return worksheet
+
+
+    def update_cell(self, page, row, col, value):
+        worksheet = self.get_worksheet(page)
         worksheet.update_cell(row, col, str(value))
 
 
     def get_last_row(self, page: str, col: int = 1) -> int:
-        worksheet = self.spreadsheet.worksheet(page)
+        worksheet = self.get_worksheet(page)
         count = len(worksheet.col_values(col))
         return count
 
 
     def get_titles(self, page: str) -> list[Title]:
-        worksheet = self.spreadsheet.worksheet(page)
-        cols = worksheet.row_values(1)
+        cached = self.titles.get(page)
+        if cached and self._is_fresh(cached[0]):
+            return cached[1]
+
+        cols = self.get_worksheet(page).row_values(1)
         titles = [Title(cols[i], i+1) for i in range(len(cols))]
+        self.titles[page] = (time.monotonic(), titles)
         return titles
 
 
+    # Раскладываем запись по колонкам в порядке заголовков листа
+    def make_row(self, page: str, record: dict[str, Any]) -> list[str]:
+        titles = self.get_titles(page)
+        row = [""] * len(titles)
+
+        for title in titles:
+            value = record.get(title.value)
+            if value is not None:
+                row[title.col - 1] = str(value)
+        return row
+
+
+    # Добавляем все записи одним запросом, без поиска последней строки
+    def append_rows(self, page: str, records: list[dict[str, Any]]):
+        # Поле без колонки означает, что заголовки могли поменяться — перечитываем их
+        known = {title.value for title in self.get_titles(page)}
+        if any(key not in known for record in records for key in record):
+            self.refresh(page)
+
+        rows = [self.make_row(page, record) for record in records]
+
+        import gspread
+
+        started = time.perf_counter()
+        try:
+            self.get_worksheet(page).append_rows(rows, value_input_option="USER_ENTERED", table_range="A1")
+        except (gspread.exceptions.APIError, gspread.exceptions.WorksheetNotFound):
+            APPEND_ROWS_FAILURES.inc()
+            # Лист мог быть переименован или изменен, следующая запись загрузит его заново
+            self.refresh(page)
+            raise
+        finally:
+            APPEND_ROWS_SECONDS.observe(time.perf_counter() - started)
+
+
+    def append_row(self, page: str, record: dict[str, Any]):
+        self.append_rows(page, [record])
+
+
 table = Spreadsheet()
@@ -0,0 +1,148 @@
+import asyncio
+import uuid
+from collections import OrderedDict, defaultdict
+from enum import StrEnum
+from typing import Any
+
+from app.general.utils.config import app_config
+from app.general.utils.logger import logger
+from app.general.utils.metrics import metrics
+from app.pkg_spreadsheet.models.Spreadsheet import Spreadsheet, table
+
+MAX_RESULTS = 10000
+
+
+class WriteStatus(StrEnum):
+    PENDING = "pending"
+    DONE = "done"
+    ERROR = "error"
+    UNKNOWN = "unknown"
+
+
+class WriteRequest:
+    def __init__(self, page: str, record: dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.page = page
+        self.record = record
+
+
+class SpreadsheetWriter:
+    def __init__(self, spreadsheet: Spreadsheet,
+                 batch_size: int = app_config.sheets_batch_size,
+                 flush_interval: float = app_config.sheets_flush_interval,
+                 max_queue_size: int = app_config.sheets_queue_max_size):
+        self.spreadsheet = spreadsheet
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # None в очереди — сигнал остановки: обработчик дописывает собранную пачку и завершается
+        self.queue: asyncio.Queue[WriteRequest | None] = asyncio.Queue(maxsize=max_queue_size)
+        # id записи -> результат, старые результаты вытесняются
+        self.results: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._worker: asyncio.Task | None = None
+
+    # Ставим запись в очередь и сразу возвращаем ее id; при переполнении бросает asyncio.QueueFull
+    def submit(self, page: str, record: dict[str, Any]) -> str:
+        request = WriteRequest(page, record)
+        self.queue.put_nowait(request)
+        self._set_result(request.id, WriteStatus.PENDING)
+        return request.id
+
+    def get_status(self, request_id: str) -> dict[str, Any]:
+        return self.results.get(request_id, {"status": WriteStatus.UNKNOWN})
+
+    def _set_result(self, request_id: str, status: WriteStatus, details: str | None = None):
+        result = {"status": status}
+        if details:
+            result["details"] = details
+
+        self.results[request_id] = result
+        self.results.move_to_end(request_id)
+
+        while len(self.results) > MAX_RESULTS:
+            self.results.popitem(last=False)
+
+    # Собираем пачку: до batch_size записей или пока не истечет flush_interval
+    async def _collect(self) -> tuple[list[WriteRequest], bool]:
+        request = await self.queue.get()
+        if request is None:
+            return [], True
+
+        batch = [request]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                request = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    # Один запрос append_rows на каждый лист; gspread синхронный, поэтому выполняем его в пуле потоков
+    async def _flush(self, batch: list[WriteRequest]):
+        pages: dict[str, list[WriteRequest]] = defaultdict(list)
+        for request in batch:
+            pages[request.page].append(request)
+
+        loop = asyncio.get_running_loop()
+
+        for page, requests in pages.items():
+            records = [request.record for request in requests]
+
+            try:
+                await loop.run_in_executor(None, self.spreadsheet.append_rows, page, records)
+                status, details = WriteStatus.DONE, None
+            except Exception as e:
+                logger.error("Failed to append %d rows to %s: %s", len(records), page, e)
+                status, details = WriteStatus.ERROR, str(e)
+
+            for request in requests:
+                self._set_result(request.id, status, details)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    # Обработчик дописывает все, что было в очереди до сигнала остановки, включая собираемую пачку
+    async def stop(self):
+        if self._worker:
+            # Упавший обработчик уже не разберет полную очередь, поэтому сигнал ждем только пока он жив
+            signal = asyncio.ensure_future(self.queue.put(None))
+            await asyncio.wait({signal, self._worker}, return_when=asyncio.FIRST_COMPLETED)
+            await asyncio.wait({self._worker})
+            signal.cancel()
+
+            if not self._worker.cancelled() and self._worker.exception() is not None:
+                logger.error("Spreadsheet writer failed: %r", self._worker.exception())
+            self._worker = None
+
+        # Записи, поставленные без запущенного обработчика или уже после сигнала
+        batch = []
+        while not self.queue.empty():
+            request = self.queue.get_nowait()
+            if request is not None:
+                batch.append(request)
+
+        if batch:
+            await self._flush(batch)
+
+
+expense_writer = SpreadsheetWriter(table)
+
+metrics.gauge("smartstrip_sheets_queue_depth", "Expense records waiting to be written",
+              fn=lambda: expense_writer.queue.qsize())
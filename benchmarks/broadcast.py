@@ -0,0 +1,96 @@
+# Массовая команда на все ленты: POST /smart-strip/v1.0/bulk с all=true и wait=true на 1000 эмулированных
+# лент с подтверждениями. Печатает JSON с задержкой команды и числом кадров и ack на ленту.
+#
+#   python -m benchmarks.broadcast --devices 1000 --rounds 20
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+
+from benchmarks.load import SimulatedStrip, percentile
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="SmartStrip bulk command benchmark")
+    parser.add_argument("--devices", type=int, default=1000, help="simulated strips")
+    parser.add_argument("--rounds", type=int, default=20, help="bulk commands to send one after another")
+    parser.add_argument("--ack-latency", type=float, default=0.005, help="strip ack delay, seconds")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+
+    import main
+    from app.general.utils.config import app_config
+    from app.pkg_spreadsheet.models.Spreadsheet import table
+    from benchmarks.stubs import install_fake_spreadsheet
+
+    app = main.app
+    # Таблица в этом стенде не нужна, подмена только убирает попытку подключиться к Google
+    install_fake_spreadsheet(table, {})
+    headers = {"X-API-Key": app_config.api_key}
+    latencies: list[float] = []
+    errors = 0
+
+    async with app.router.lifespan_context(app):
+        strips = [SimulatedStrip(app, f"strip-{i}", app_config.api_key, args.ack_latency) for i in range(args.devices)]
+        await asyncio.gather(*(strip.connect() for strip in strips))
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench", timeout=60) as client:
+            for n in range(args.rounds):
+                started = time.perf_counter()
+                resp = await client.post("/smart-strip/v1.0/bulk", headers=headers, json={
+                    "all": True,
+                    "state": {"brightness": n % 101},
+                    "wait": True
+                })
+                latencies.append(time.perf_counter() - started)
+
+                statuses = [device["status"] for device in resp.json()["devices"]]
+                errors += len(statuses) - statuses.count("DONE")
+
+        await asyncio.gather(*(strip.close() for strip in strips))
+
+    return {
+        "config": vars(args),
+        "broadcast": {
+            "rounds": args.rounds,
+            "device_errors": errors,
+            "p50_ms": round(percentile(latencies, 0.50) * 1e3, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1e3, 2),
+            "max_ms": round(max(latencies, default=0.0) * 1e3, 2),
+            "per_device_us": round(percentile(latencies, 0.50) / args.devices * 1e6, 2)
+        },
+        "strips": {
+            "frames": sum(strip.frames for strip in strips),
+            "acks": sum(strip.acks for strip in strips)
+        },
+        "rss_peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+
+def main_():
+    args = parse_args()
+
+    # Конфиг читается при импорте приложения, поэтому окружение готовим заранее
+    os.environ.setdefault("LOGIN", "login")
+    os.environ.setdefault("PASSWORD", "password")
+    os.environ.setdefault("API_KEY", "key")
+    os.environ.setdefault("CLIENT_ID", "client_id")
+    os.environ.setdefault("CLIENT_SECRET", "client_secret")
+    os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+    os.environ["LOG_LEVEL"] = args.log_level
+    os.environ["STATE_STORE_PATH"] = ""
+    os.environ["DEVICE_ROUTER"] = "local"
+
+    sys.stdout.write(json.dumps(asyncio.run(run(args)), indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,110 @@
+# Размер и стоимость сборки кадра состояния: прежняя сериализация pydantic, полное состояние исходного
+# протокола, дельта версии 2 и бинарный кадр. Команды Яндекса обычно меняют одно поле, такие изменения
+# и прогоняются.
+#
+#   python -m benchmarks.delta_frames
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("LOGIN", "login")
+os.environ.setdefault("PASSWORD", "password")
+os.environ.setdefault("API_KEY", "key")
+os.environ.setdefault("CLIENT_ID", "client_id")
+os.environ.setdefault("CLIENT_SECRET", "client_secret")
+os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+os.environ.setdefault("STATE_STORE_PATH", "")
+
+from app.pkg_smart_strip.models.Device import SmartStripDevice, HSVColor, DeviceMode
+from app.pkg_smart_strip.models.WireFormat import FrameType, encode_state
+
+UPDATES = 50_000
+ROUNDS = 5
+
+
+def make_updates(n: int) -> list[tuple[str, object]]:
+    rng = random.Random(0)
+    modes = list(DeviceMode)
+    updates = []
+
+    for _ in range(n):
+        field = rng.choice(("on", "brightness", "program", "hsv"))
+        if field == "on":
+            value = rng.random() < 0.5
+        elif field == "brightness":
+            value = rng.randrange(101)
+        elif field == "program":
+            value = rng.choice(modes)
+        else:
+            value = HSVColor(h=rng.randrange(361), s=rng.randrange(101), v=rng.randrange(101))
+        updates.append((field, value))
+    return updates
+
+
+# Прежний путь: состояние целиком через pydantic на каждое изменение, без сравнения с отправленным
+def encode_model_dump_json(device: SmartStripDevice) -> str | bytes | None:
+    return device.state.model_dump_json()
+
+
+# Тот же путь, что у DeviceOutbox._send_state: собрать кадр, сериализовать, подтвердить отправку
+def encode_full_json(device: SmartStripDevice) -> str | bytes | None:
+    frame = device.build_state_frame(full=True)
+    if frame is None:
+        return None
+    device.confirm_state_frame(frame)
+    return json.dumps(frame["full"], separators=(",", ":"))
+
+
+def encode_delta_json(device: SmartStripDevice) -> str | bytes | None:
+    frame = device.build_state_frame()
+    if frame is None:
+        return None
+    device.confirm_state_frame(frame)
+    return json.dumps(frame, separators=(",", ":"))
+
+
+def encode_binary(device: SmartStripDevice) -> str | bytes | None:
+    frame = device.build_state_frame(full=True)
+    if frame is None:
+        return None
+    device.confirm_state_frame(frame)
+    return encode_state(FrameType.STATE, frame["seq"], frame["full"])
+
+
+def measure(encode, updates: list[tuple[str, object]]) -> dict:
+    best = float("inf")
+    sent_bytes = frames = 0
+
+    for _ in range(ROUNDS):
+        device = SmartStripDevice("bench")
+        sent_bytes = frames = 0
+
+        started = time.perf_counter()
+        for field, value in updates:
+            setattr(device.state, field, value)
+            data = encode(device)
+            if data is not None:
+                frames += 1
+                sent_bytes += len(data)
+        best = min(best, time.perf_counter() - started)
+
+    return {
+        "frames": frames,
+        "bytes_per_frame": round(sent_bytes / frames, 1),
+        "us_per_update": round(best / len(updates) * 1e6, 2)
+    }
+
+
+def main_():
+    updates = make_updates(UPDATES)
+    print(json.dumps({
+        "model_dump_json": measure(encode_model_dump_json, updates),
+        "full_json": measure(encode_full_json, updates),
+        "delta_json": measure(encode_delta_json, updates),
+        "binary": measure(encode_binary, updates)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main_()
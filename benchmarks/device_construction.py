@@ -0,0 +1,80 @@
+# Стоимость создания SmartStripDevice при подключении ленты: время и память на устройство.
+# Для сравнения рядом собирается устройство со своими описаниями возможностей, как до их общего кеша.
+#
+#   python -m benchmarks.device_construction
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("LOGIN", "login")
+os.environ.setdefault("PASSWORD", "password")
+os.environ.setdefault("API_KEY", "key")
+os.environ.setdefault("CLIENT_ID", "client_id")
+os.environ.setdefault("CLIENT_SECRET", "client_secret")
+os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+os.environ.setdefault("STATE_STORE_PATH", "")
+
+from app.pkg_smart_strip.models.Device import (
+    Capability, Device, DeviceInfo, DeviceMode, SmartStripDevice, SmartStripState
+)
+
+TIMED = 20_000
+RETAINED = 5_000
+
+
+def per_device_descriptors(device_id: str) -> Device[SmartStripState]:
+    return Device[SmartStripState](
+        id=device_id,
+        name="Умная лента",
+        device_type="devices.types.light",
+        capabilities=(
+            Capability(type="devices.capabilities.on_off", retrievable=True, parameters={}),
+            Capability(type="devices.capabilities.range", retrievable=True, parameters={
+                "instance": "brightness",
+                "unit": "unit.percent",
+                "range": {"min": 0, "max": 100, "precision": 1}
+            }),
+            Capability(type="devices.capabilities.mode", retrievable=True, parameters={
+                "instance": "program",
+                "modes": [{"value": mode} for mode in DeviceMode]
+            }),
+            Capability(type="devices.capabilities.color_setting", retrievable=True,
+                       parameters={"color_model": "hsv"})
+        ),
+        device_info=DeviceInfo(manufacturer="Maxs", model="Strip", hw_version="1.0", sw_version="1.0"),
+        state=SmartStripState()
+    )
+
+
+def measure(factory) -> dict:
+    factory("warm-up")
+
+    started = time.perf_counter()
+    for i in range(TIMED):
+        factory(str(i))
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    devices = [factory(str(i)) for i in range(RETAINED)]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del devices
+
+    return {
+        "construct_us": round(elapsed / TIMED * 1e6, 2),
+        "bytes_per_device": round(retained / RETAINED)
+    }
+
+
+def main_():
+    print(json.dumps({
+        "shared_descriptors": measure(SmartStripDevice),
+        "per_device_descriptors": measure(per_device_descriptors)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main_()
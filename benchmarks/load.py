@@ -0,0 +1,313 @@
+# Нагрузочный стенд: приложение в процессе, N эмулированных лент, заглушки Яндекса и Google Sheets.
+# Гоняет запросы discovery/query/action умного дома и /add_new_expense с заданной частотой
+# и печатает JSON с p50/p99, пропускной способностью и RSS.
+#
+#   python -m benchmarks.load --devices 200 --duration 20 --query-rate 200 --output result.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import sys
+import time
+from typing import Any, Awaitable, Callable
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="SmartStrip load benchmark")
+    parser.add_argument("--devices", type=int, default=100, help="simulated strips")
+    parser.add_argument("--users", type=int, default=10, help="distinct Yandex users (tokens)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of traffic per scenario")
+    parser.add_argument("--ack-latency", type=float, default=0.005, help="strip ack delay, seconds")
+    parser.add_argument("--yandex-latency", type=float, default=0.02, help="OAuth stub delay, seconds")
+    parser.add_argument("--sheets-latency", type=float, default=0.2, help="fake Sheets call delay, seconds")
+    parser.add_argument("--discovery-rate", type=float, default=5.0, help="requests per second")
+    parser.add_argument("--query-rate", type=float, default=50.0, help="requests per second")
+    parser.add_argument("--action-rate", type=float, default=50.0, help="requests per second")
+    parser.add_argument("--expense-rate", type=float, default=20.0, help="requests per second")
+    parser.add_argument("--report-rate", type=float, default=20.0, help="strip state reports per second")
+    parser.add_argument("--callback-failure-rate", type=float, default=0.0, help="share of failed state callbacks")
+    parser.add_argument("--query-size", type=int, default=10, help="devices per query request")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# Лента, подключенная к приложению напрямую через ASGI по протоколу версии 2 с ?acks=1: отвечает ack на каждый кадр состояния
+class SimulatedStrip:
+    def __init__(self, app, device_id: str, api_key: str, ack_latency: float):
+        self.app = app
+        self.device_id = device_id
+        self.api_key = api_key
+        self.ack_latency = ack_latency
+        self.frames = 0
+        self.acks = 0
+        self.closed = False
+        self._inbox: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._accepted = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _scope(self) -> dict[str, Any]:
+        path = f"/smart-strip/v1.0/websocket/{self.device_id}"
+        return {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "wss",
+            "http_version": "1.1",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"acks=1&proto=2",
+            "headers": [(b"host", b"bench"), (b"x-api-key", self.api_key.encode())],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 443),
+            "subprotocols": []
+        }
+
+    async def _receive(self) -> dict[str, Any]:
+        return await self._inbox.get()
+
+    async def _send(self, message: dict[str, Any]):
+        kind = message["type"]
+
+        if kind == "websocket.accept":
+            self._accepted.set()
+        elif kind == "websocket.send":
+            self.frames += 1
+            text = message.get("text")
+            seq = json.loads(text).get("seq") if text else None
+            if seq is not None:
+                asyncio.get_running_loop().call_later(self.ack_latency, self._ack, seq)
+        elif kind == "websocket.close":
+            self.closed = True
+            self._accepted.set()
+
+    # Изменение состояния на стороне ленты, например нажатие кнопки
+    def report(self, seq: int, state: dict[str, Any]):
+        self._inbox.put_nowait({"type": "websocket.receive", "text": json.dumps({"type": "report", "seq": seq, "state": state})})
+
+    def _ack(self, seq: int):
+        if not self.closed:
+            self.acks += 1
+            self._inbox.put_nowait({"type": "websocket.receive", "text": json.dumps({"type": "ack", "seq": seq})})
+
+    async def connect(self):
+        self._inbox.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(self._scope(), self._receive, self._send))
+        await self._accepted.wait()
+
+    async def close(self):
+        self.closed = True
+        self._inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        if self._task:
+            await self._task
+
+
+# Открытая модель нагрузки: запросы стартуют по расписанию, не дожидаясь ответов на предыдущие
+async def drive(rate: float, duration: float, request: Callable[[int], Awaitable[bool]]) -> dict[str, Any]:
+    if rate <= 0:
+        return {"requests": 0}
+
+    loop = asyncio.get_running_loop()
+    latencies: list[float] = []
+    errors = 0
+    tasks: set[asyncio.Task] = set()
+
+    async def one(n: int):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = await request(n)
+        except Exception:
+            ok = False
+        latencies.append(time.perf_counter() - started)
+        if not ok:
+            errors += 1
+
+    started = loop.time()
+    n = 0
+    while (now := loop.time()) < started + duration:
+        scheduled = started + n / rate
+        if scheduled > now:
+            await asyncio.sleep(scheduled - now)
+
+        task = asyncio.create_task(one(n))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        n += 1
+
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - started
+
+    return {
+        "requests": n,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1e3, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1e3, 2)
+    }
+
+
+async def run(args: argparse.Namespace, stub_port: int) -> dict[str, Any]:
+    import httpx
+    import uvicorn
+
+    import main
+    from app.general.utils.config import app_config
+    from app.pkg_spreadsheet.models.Budget import BudgetTitles
+    from app.pkg_spreadsheet.models.Spreadsheet import Worksheets, table
+    from benchmarks.stubs import create_yandex_stub, install_fake_spreadsheet
+
+    app = main.app
+
+    stub = create_yandex_stub(args.yandex_latency, args.callback_failure_rate)
+    stub_server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=stub_port, log_level="warning", lifespan="off"))
+    stub_task = asyncio.create_task(stub_server.serve())
+    while not stub_server.started:
+        await asyncio.sleep(0.01)
+
+    fake_sheets = install_fake_spreadsheet(table, {Worksheets.BUDGET: [title.value for title in BudgetTitles]},
+                                           args.sheets_latency)
+
+    device_ids = [f"strip-{i}" for i in range(args.devices)]
+    headers = [{"Authorization": f"Bearer bench-{i}", "X-Request-Id": f"bench-{i}"} for i in range(args.users)]
+    rng = random.Random(0)
+
+    async def discovery(n: int) -> bool:
+        resp = await client.get("/smart-strip/v1.0/user/devices", headers=headers[n % args.users])
+        return resp.status_code == 200
+
+    async def query(n: int) -> bool:
+        ids = rng.sample(device_ids, min(args.query_size, len(device_ids)))
+        resp = await client.post("/smart-strip/v1.0/user/devices/query", headers=headers[n % args.users],
+                                 json={"devices": [{"id": device_id} for device_id in ids]})
+        return resp.status_code == 200
+
+    async def action(n: int) -> bool:
+        resp = await client.post("/smart-strip/v1.0/user/devices/action", headers=headers[n % args.users], json={
+            "payload": {"devices": [{
+                "id": device_ids[n % len(device_ids)],
+                "capabilities": [{"type": "devices.capabilities.range", "state": {"instance": "brightness", "value": n % 101}}]
+            }]}
+        })
+        if resp.status_code != 200:
+            return False
+        results = resp.json()["payload"]["devices"][0]["capabilities"]
+        return all(cap["state"]["action_result"]["status"] == "DONE" for cap in results)
+
+    async def expense(n: int) -> bool:
+        resp = await client.post("/add_new_expense", json={"type": "food", "count": n})
+        return resp.status_code == 200 and resp.json().get("status") == "accepted"
+
+    # Отчет должен менять состояние, иначе колбэк Яндексу не отправляется. Действия трогают только яркость,
+    # а здесь каждая лента переключает on: ее отчеты идут с шагом len(strips), первый выключает ленту
+    async def report(n: int) -> bool:
+        strips[n % len(strips)].report(n + 1, {"on": n // len(strips) % 2 == 1})
+        return True
+
+    rss_before = rss_kb()
+
+    async with app.router.lifespan_context(app):
+        strips = [SimulatedStrip(app, device_id, app_config.api_key, args.ack_latency) for device_id in device_ids]
+        await asyncio.gather(*(strip.connect() for strip in strips))
+
+        # https, чтобы HTTPSRedirectMiddleware пропускала запросы как в проде
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+            scenarios = await asyncio.gather(
+                drive(args.discovery_rate, args.duration, discovery),
+                drive(args.query_rate, args.duration, query),
+                drive(args.action_rate, args.duration, action),
+                drive(args.expense_rate, args.duration, expense),
+                drive(args.report_rate, args.duration, report)
+            )
+
+        rss_loaded = rss_kb()
+        await asyncio.gather(*(strip.close() for strip in strips))
+
+    stub_server.should_exit = True
+    await stub_task
+
+    budget = fake_sheets.sheets[Worksheets.BUDGET]
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": dict(zip(["discovery", "query", "action", "add_new_expense", "strip_report"], scenarios)),
+        "strips": {
+            "frames": sum(strip.frames for strip in strips),
+            "acks": sum(strip.acks for strip in strips)
+        },
+        "upstream": {
+            "yandex_userinfo_requests": stub.state.userinfo_requests,
+            "yandex_token_requests": stub.state.token_requests,
+            "yandex_callback_requests": stub.state.callback_requests,
+            "yandex_callback_failures": stub.state.callback_failures,
+            "yandex_callback_devices": stub.state.callback_devices,
+            "sheets_append_calls": budget.append_calls,
+            "sheets_rows_written": len(budget.rows) - 1
+        },
+        "rss_kb": {
+            "before": rss_before,
+            "loaded": rss_loaded,
+            "peak": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        }
+    }
+
+
+def main_():
+    args = parse_args()
+    stub_port = free_port()
+
+    # Конфиг читается при импорте приложения, поэтому окружение готовим заранее
+    os.environ.setdefault("LOGIN", "login")
+    os.environ.setdefault("PASSWORD", "password")
+    os.environ.setdefault("API_KEY", "key")
+    os.environ.setdefault("CLIENT_ID", "client_id")
+    os.environ.setdefault("CLIENT_SECRET", "client_secret")
+    os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+    os.environ["LOG_LEVEL"] = args.log_level
+    os.environ["STATE_STORE_PATH"] = ""
+    os.environ["DEVICE_ROUTER"] = "local"
+    os.environ["YANDEX_USERINFO_URL"] = f"http://127.0.0.1:{stub_port}/info"
+    os.environ["YANDEX_TOKEN_URL"] = f"http://127.0.0.1:{stub_port}/token"
+    os.environ["YANDEX_SKILL_ID"] = "bench"
+    os.environ["YANDEX_SKILL_TOKEN"] = "bench"
+    os.environ["YANDEX_CALLBACK_URL"] = f"http://127.0.0.1:{stub_port}/api/v1/skills/{{skill_id}}/callback/state"
+
+    report = json.dumps(asyncio.run(run(args, stub_port)), indent=2)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    else:
+        sys.stdout.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main_()
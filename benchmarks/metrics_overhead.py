@@ -0,0 +1,133 @@
+# Накладные расходы метрик на горячем пути. Запрос query прогоняется через ASGI-стек
+# с MetricsMiddleware и без нее; разница end-to-end тонет в шуме, поэтому порог проверяется
+# по стоимости самой мидлвари и счетчиков запроса, измеренной отдельно, к времени запроса.
+#
+#   python -m benchmarks.metrics_overhead
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("LOGIN", "login")
+os.environ.setdefault("PASSWORD", "password")
+os.environ.setdefault("API_KEY", "key")
+os.environ.setdefault("CLIENT_ID", "client_id")
+os.environ.setdefault("CLIENT_SECRET", "client_secret")
+os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+os.environ.setdefault("STATE_STORE_PATH", "")
+
+import httpx
+from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
+
+import main
+from app.general.utils.metrics import MetricsMiddleware, Histogram, Counter
+from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.UserRegistry import users_cache
+
+DEVICES = 10
+REQUESTS = 2000
+ROUNDS = 7
+LIMIT = 0.02
+
+
+# Два готовых стека мидлварей одного приложения: с метриками и без
+def build_stack(with_metrics: bool):
+    app = main.app
+    original = app.user_middleware
+    app.user_middleware = [
+        m for m in original
+        if m.cls is not HTTPSRedirectMiddleware and (with_metrics or m.cls is not MetricsMiddleware)
+    ]
+    stack = app.build_middleware_stack()
+    app.user_middleware = original
+
+    async def asgi(scope, receive, send):
+        scope["app"] = app
+        await stack(scope, receive, send)
+    return asgi
+
+
+async def run_round(client: httpx.AsyncClient, body: bytes) -> float:
+    headers = {"Authorization": "Bearer token_id", "Content-Type": "application/json"}
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await client.post("/smart-strip/v1.0/user/devices/query", content=body, headers=headers)
+    return (time.perf_counter() - started) / REQUESTS
+
+
+# Раунды чередуются, чтобы прогрев и дрейф частоты одинаково влияли на оба варианта
+async def measure() -> tuple[float, float]:
+    body = json.dumps({"devices": [{"id": str(i)} for i in range(DEVICES)]}).encode()
+    clients = [
+        httpx.AsyncClient(transport=httpx.ASGITransport(app=build_stack(with_metrics)), base_url="http://bench")
+        for with_metrics in (False, True)
+    ]
+    rounds: list[list[float]] = [[], []]
+
+    for client in clients:
+        await run_round(client, body)
+
+    for _ in range(ROUNDS):
+        for i, client in enumerate(clients):
+            rounds[i].append(await run_round(client, body))
+
+    for client in clients:
+        await client.aclose()
+    return min(rounds[0]), min(rounds[1])
+
+
+async def _noop(scope, receive, send):
+    pass
+
+
+# Мидлварь вокруг пустого приложения плюс счетчики, которые срабатывают внутри запроса
+async def metrics_cost() -> float:
+    route = main.app.routes[0]
+    scope = {"type": "http", "method": "POST", "route": route}
+    middleware = MetricsMiddleware(_noop)
+    histogram, counter = Histogram((0.001, 0.01, 0.1, 1.0)), Counter()
+    n = 200_000
+
+    started = time.perf_counter()
+    for _ in range(n):
+        await middleware(scope, None, None)
+    wrapped = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(n):
+        await _noop(scope, None, None)
+    middleware_cost = wrapped - (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(n):
+        counter.inc()
+        histogram.observe(0.005)
+    counters_cost = time.perf_counter() - started
+
+    return (middleware_cost + counters_cost) / n
+
+
+def main_():
+    users_cache.init_test_user()
+    for i in range(DEVICES):
+        devices_registry.init_test_device(str(i))
+
+    baseline, instrumented = asyncio.run(measure())
+    cost = asyncio.run(metrics_cost())
+    overhead = cost / baseline
+
+    print(json.dumps({
+        "baseline_us": round(baseline * 1e6, 1),
+        "instrumented_us": round(instrumented * 1e6, 1),
+        "end_to_end_overhead": round((instrumented - baseline) / baseline, 4),
+        "metrics_cost_us": round(cost * 1e6, 2),
+        "overhead": round(overhead, 4),
+        "limit": LIMIT
+    }, indent=2))
+
+    sys.exit(0 if overhead < LIMIT else 1)
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,91 @@
+# Запрос состояния и команда на 1000 устройств через обработчики возможностей: целиком через ASGI-стек
+# и отдельно стоимость query_capabilities/apply_capability на одно устройство.
+#
+#   python -m benchmarks.query_handlers
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("LOGIN", "login")
+os.environ.setdefault("PASSWORD", "password")
+os.environ.setdefault("API_KEY", "key")
+os.environ.setdefault("CLIENT_ID", "client_id")
+os.environ.setdefault("CLIENT_SECRET", "client_secret")
+os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+os.environ.setdefault("STATE_STORE_PATH", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+import main
+from app.pkg_smart_strip.models.Capabilities import RANGE, COLOR_SETTING, apply_capability, query_capabilities
+from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.UserRegistry import users_cache
+
+DEVICES = 1000
+REQUESTS = 50
+CALLS = 200_000
+
+
+async def measure_requests() -> dict:
+    headers = {"Authorization": "Bearer token_id", "X-Request-Id": "bench"}
+    ids = [{"id": str(i)} for i in range(DEVICES)]
+    query_body = json.dumps({"devices": ids}).encode()
+    action_body = json.dumps({"payload": {"devices": [
+        {
+            "id": device["id"],
+            "capabilities": [
+                {"type": RANGE, "state": {"instance": "brightness", "value": 40}},
+                {"type": COLOR_SETTING, "state": {"instance": "hsv", "value": {"h": 120, "s": 50, "v": 50}}}
+            ]
+        }
+        for device in ids
+    ]}}).encode()
+
+    result = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+        for name, path, body in (
+            ("query", "/smart-strip/v1.0/user/devices/query", query_body),
+            ("action", "/smart-strip/v1.0/user/devices/action", action_body)
+        ):
+            await client.post(path, content=body, headers={**headers, "Content-Type": "application/json"})
+
+            started = time.perf_counter()
+            for _ in range(REQUESTS):
+                resp = await client.post(path, content=body, headers={**headers, "Content-Type": "application/json"})
+                assert resp.status_code == 200, resp.text
+            result[f"{name}_{DEVICES}_devices_ms"] = round((time.perf_counter() - started) / REQUESTS * 1e3, 2)
+    return result
+
+
+def measure_handlers() -> dict:
+    device = devices_registry.get_device_by_id("0")
+
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        query_capabilities(device)
+    query_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(CALLS):
+        apply_capability(device, RANGE, "brightness", i % 101)
+    apply_seconds = time.perf_counter() - started
+
+    return {
+        "query_capabilities_us": round(query_seconds / CALLS * 1e6, 3),
+        "apply_capability_us": round(apply_seconds / CALLS * 1e6, 3)
+    }
+
+
+def main_():
+    users_cache.init_test_user()
+    for i in range(DEVICES):
+        devices_registry.init_test_device(str(i))
+
+    print(json.dumps({**asyncio.run(measure_requests()), **measure_handlers()}, indent=2))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,68 @@
+# Поиск ленты в DeviceRegistry от 10 до 100k подключенных устройств. Для сравнения
+# рядом меряется прежний вариант реестра - линейный проход по списку.
+#
+#   python -m benchmarks.registry_lookup
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("LOGIN", "login")
+os.environ.setdefault("PASSWORD", "password")
+os.environ.setdefault("API_KEY", "key")
+os.environ.setdefault("CLIENT_ID", "client_id")
+os.environ.setdefault("CLIENT_SECRET", "client_secret")
+os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+os.environ.setdefault("STATE_STORE_PATH", "")
+
+from app.pkg_smart_strip.models.Device import SmartStripDevice
+from app.pkg_smart_strip.models.DeviceRegistry import DeviceRegistry
+
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+LOOKUPS = 20_000
+# Линейный поиск на больших реестрах слишком медленный для полного числа запросов
+LIST_LOOKUP_BUDGET = 2_000_000
+
+
+def list_lookup(devices: list[SmartStripDevice], device_id: str) -> SmartStripDevice | None:
+    return next((device for device in devices if device.id == device_id), None)
+
+
+def per_lookup(fn, ids: list[str]) -> float:
+    started = time.perf_counter()
+    for device_id in ids:
+        fn(device_id)
+    return (time.perf_counter() - started) / len(ids)
+
+
+def measure(size: int) -> dict:
+    registry = DeviceRegistry()
+    registry.devices = dict()
+    registry.groups = dict()
+    registry.discovery = dict()
+
+    devices = [SmartStripDevice(str(i)) for i in range(size)]
+    for device in devices:
+        registry.devices[device.id] = device
+
+    rng = random.Random(size)
+    ids = [str(rng.randrange(size)) for _ in range(LOOKUPS)]
+    # Половина промахов: id, которых нет в реестре
+    ids += [f"missing-{i}" for i in range(LOOKUPS // 2)]
+    rng.shuffle(ids)
+
+    list_ids = ids[:max(10, min(len(ids), LIST_LOOKUP_BUDGET // size))]
+
+    return {
+        "devices": size,
+        "dict_ns": round(per_lookup(registry.get_device_by_id, ids) * 1e9, 1),
+        "list_ns": round(per_lookup(lambda device_id: list_lookup(devices, device_id), list_ids) * 1e9, 1),
+    }
+
+
+def main_():
+    print(json.dumps([measure(size) for size in SIZES], indent=2))
+
+
+if __name__ == "__main__":
+    main_()
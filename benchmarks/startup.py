@@ -0,0 +1,106 @@
+# Время импорта приложения и запуска lifespan. Импорт меряется в отдельных процессах, запуск -
+# с зависшим подключением к Google Sheets: маршруты лент должны отвечать, пока таблица недоступна.
+#
+#   python -m benchmarks.startup
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+os.environ.setdefault("LOGIN", "login")
+os.environ.setdefault("PASSWORD", "password")
+os.environ.setdefault("API_KEY", "key")
+os.environ.setdefault("CLIENT_ID", "client_id")
+os.environ.setdefault("CLIENT_SECRET", "client_secret")
+os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+os.environ.setdefault("STATE_STORE_PATH", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_RUNS = 5
+# Запуск не должен ждать таблицу: порог много меньше задержки подключения к ней
+SHEETS_DELAY = 5.0
+STARTUP_LIMIT = 1.0
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "gspread": "gspread" in sys.modules,
+    "google_auth": "google.oauth2" in sys.modules
+}))
+"""
+
+
+def measure_import() -> dict:
+    runs = []
+    for _ in range(IMPORT_RUNS):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=os.environ,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+
+    return {
+        "import_ms": round(statistics.median(run["seconds"] for run in runs) * 1000, 1),
+        "gspread_imported": any(run["gspread"] for run in runs),
+        "google_auth_imported": any(run["google_auth"] for run in runs)
+    }
+
+
+async def measure_startup() -> dict:
+    import httpx
+
+    import main
+    from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+    from app.pkg_smart_strip.models.UserRegistry import users_cache
+    from app.pkg_spreadsheet.models.Spreadsheet import table
+
+    # Подключение к таблице висит, пока его не отпустят при остановке
+    released = threading.Event()
+    table.connect = lambda: released.wait(SHEETS_DELAY)
+
+    users_cache.init_test_user()
+    devices_registry.init_test_device()
+
+    started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        lifespan_ready = time.perf_counter() - started
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+            response = await client.post(
+                "/smart-strip/v1.0/user/devices/query",
+                json={"devices": [{"id": "test"}]},
+                headers={"Authorization": "Bearer token_id", "X-Request-Id": "startup"}
+            )
+        first_response = time.perf_counter() - started
+        sheets_connected = table.is_connected
+        released.set()
+
+    return {
+        "lifespan_ready_ms": round(lifespan_ready * 1000, 1),
+        "first_query_ms": round(first_response * 1000, 1),
+        "first_query_status": response.status_code,
+        "sheets_connected_at_first_query": sheets_connected
+    }
+
+
+def main_():
+    result = {**measure_import(), **asyncio.run(measure_startup()), "limit_ms": STARTUP_LIMIT * 1000}
+    print(json.dumps(result, indent=2))
+
+    ok = (
+        not result["gspread_imported"]
+        and result["first_query_status"] == 200
+        and result["first_query_ms"] < STARTUP_LIMIT * 1000
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,142 @@
+# Заглушки внешних сервисов для нагрузочного стенда: OAuth Яндекса и Google Sheets
+import random
+import sys
+import time
+import types
+from collections import Counter
+from typing import Any
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+
+# login.yandex.ru/info, oauth.yandex.ru/token и callback навыка на dialogs.yandex.net:
+# токен bench-<n> принадлежит пользователю n и обновляется по refresh-<n>, другие refresh_token отклоняются;
+# callback отвечает 500 с вероятностью callback_failure_rate или по очереди кодами из state.callback_statuses
+def create_yandex_stub(latency: float = 0.0, callback_failure_rate: float = 0.0) -> FastAPI:
+    import asyncio
+
+    stub = FastAPI()
+    stub.state.userinfo_requests = 0
+    # Код, которым userinfo отвечает на все запросы, например 429 для проверки ограничения частоты
+    stub.state.userinfo_status = None
+    stub.state.token_requests = 0
+    stub.state.callback_requests = 0
+    stub.state.callback_failures = 0
+    stub.state.callback_devices = 0
+    # Коды, которыми callback отвечает на очередные запросы, прежде чем принять их; время и тело каждого запроса
+    stub.state.callback_statuses = []
+    stub.state.callback_log = []
+    rng = random.Random(0)
+
+    @stub.get("/info")
+    async def userinfo(authorization: str = Header("")):
+        stub.state.userinfo_requests += 1
+        await asyncio.sleep(latency)
+
+        if stub.state.userinfo_status is not None:
+            return JSONResponse({"error": "unavailable"}, status_code=stub.state.userinfo_status)
+
+        token = authorization.removeprefix("OAuth ").strip()
+        if not token.startswith("bench-"):
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return {"id": token.removeprefix("bench-"), "login": token, "expires_in": 3600}
+
+    # Форму разбираем сами, чтобы не тянуть python-multipart
+    @stub.post("/token")
+    async def token(request: Request):
+        stub.state.token_requests += 1
+        await asyncio.sleep(latency)
+
+        refresh_token = parse_qs((await request.body()).decode()).get("refresh_token", [""])[0]
+        if not refresh_token.startswith("refresh-"):
+            return JSONResponse({"error": "invalid_grant"}, status_code=400)
+        return {"access_token": refresh_token.replace("refresh", "bench", 1), "expires_in": 3600}
+
+    @stub.post("/api/v1/skills/{skill_id}/callback/state")
+    async def callback_state(skill_id: str, request: Request):
+        stub.state.callback_requests += 1
+        body = await request.json()
+        stub.state.callback_log.append((time.monotonic(), body))
+        await asyncio.sleep(latency)
+
+        if stub.state.callback_statuses:
+            stub.state.callback_failures += 1
+            return JSONResponse({"status": "error"}, status_code=stub.state.callback_statuses.pop(0))
+
+        if rng.random() < callback_failure_rate:
+            stub.state.callback_failures += 1
+            return JSONResponse({"status": "error"}, status_code=500)
+
+        stub.state.callback_devices += len(body["payload"]["devices"])
+        return JSONResponse({"request_id": skill_id, "status": "ok"}, status_code=202)
+
+    return stub
+
+
+class FakeWorksheet:
+    def __init__(self, title: str, titles: list[str], latency: float):
+        self.title = title
+        self.rows: list[list[str]] = [titles]
+        self.latency = latency
+        self.append_calls = 0
+        # Число обращений к листу по методам, каждое обращение - запрос к Sheets
+        self.calls: Counter[str] = Counter()
+
+    def row_values(self, row: int) -> list[str]:
+        self.calls["row_values"] += 1
+        time.sleep(self.latency)
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col: int) -> list[str]:
+        self.calls["col_values"] += 1
+        time.sleep(self.latency)
+        return [row[col - 1] for row in self.rows if len(row) >= col]
+
+    def update_cell(self, row: int, col: int, value: str):
+        self.calls["update_cell"] += 1
+        time.sleep(self.latency)
+
+    # Вызывается из пула потоков SpreadsheetWriter, поэтому задержка синхронная
+    def append_rows(self, rows: list[list[str]], **kwargs: Any):
+        time.sleep(self.latency)
+        self.rows.extend(rows)
+        self.append_calls += 1
+        self.calls["append_rows"] += 1
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheets: dict[str, list[str]], latency: float):
+        self.sheets = {title: FakeWorksheet(title, titles, latency) for title, titles in worksheets.items()}
+        self.worksheet_calls = 0
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.worksheet_calls += 1
+        if title not in self.sheets:
+            raise sys.modules["gspread"].exceptions.WorksheetNotFound(title)
+        return self.sheets[title]
+
+
+# Spreadsheet импортирует gspread только ради классов исключений; без пакета подставляем модуль с ними
+def _ensure_gspread_exceptions():
+    try:
+        import gspread  # noqa: F401
+    except ImportError:
+        exceptions = types.SimpleNamespace(
+            APIError=type("APIError", (Exception,), {}),
+            WorksheetNotFound=type("WorksheetNotFound", (Exception,), {})
+        )
+        module = types.ModuleType("gspread")
+        module.exceptions = exceptions
+        sys.modules["gspread"] = module
+
+
+# Подменяем подключение к таблице, чтобы Spreadsheet не ходил в Google
+def install_fake_spreadsheet(spreadsheet, worksheets: dict[str, list[str]], latency: float = 0.0) -> FakeSpreadsheet:
+    _ensure_gspread_exceptions()
+
+    fake = FakeSpreadsheet(worksheets, latency)
+    spreadsheet._spreadsheet = fake
+    spreadsheet.refresh()
+    return fake
@@ -0,0 +1,77 @@
+# Пропускная способность кодека кадров состояния: бинарный формат против JSON, кодирование и разбор.
+#
+#   python -m benchmarks.wire_format
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("LOGIN", "login")
+os.environ.setdefault("PASSWORD", "password")
+os.environ.setdefault("API_KEY", "key")
+os.environ.setdefault("CLIENT_ID", "client_id")
+os.environ.setdefault("CLIENT_SECRET", "client_secret")
+os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+os.environ.setdefault("STATE_STORE_PATH", "")
+
+from app.pkg_smart_strip.models.Device import DeviceMode
+from app.pkg_smart_strip.models.WireFormat import FrameType, encode_state, decode_frame
+
+FRAMES = 100_000
+ROUNDS = 5
+
+
+def make_states(n: int) -> list[dict]:
+    rng = random.Random(0)
+    modes = [mode.value for mode in DeviceMode]
+    return [
+        {
+            "on": rng.random() < 0.5,
+            "brightness": rng.randrange(101),
+            "program": rng.choice(modes),
+            "hsv": {"h": rng.randrange(361), "s": rng.randrange(101), "v": rng.randrange(101)}
+        }
+        for _ in range(n)
+    ]
+
+
+def best_of(fn) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure(encode, decode, states: list[dict]) -> dict:
+    frames = [encode(seq, state) for seq, state in enumerate(states)]
+
+    encode_seconds = best_of(lambda: [encode(seq, state) for seq, state in enumerate(states)])
+    decode_seconds = best_of(lambda: [decode(frame) for frame in frames])
+
+    return {
+        "bytes_per_frame": round(sum(len(frame) for frame in frames) / len(frames), 1),
+        "encode_frames_per_s": round(len(states) / encode_seconds),
+        "decode_frames_per_s": round(len(states) / decode_seconds)
+    }
+
+
+def main_():
+    states = make_states(FRAMES)
+    print(json.dumps({
+        "binary": measure(
+            lambda seq, state: encode_state(FrameType.STATE, seq, state),
+            decode_frame,
+            states
+        ),
+        "json": measure(
+            lambda seq, state: json.dumps({"seq": seq, "full": state}, separators=(",", ":")),
+            json.loads,
+            states
+        )
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main_()
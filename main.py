@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 
 from fastapi import FastAPI
@@ -5,9 +7,40 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 
 from app.routes import router as api_router
+from app.general.utils.http_client import http_client
+from app.general.utils.metrics import MetricsMiddleware
+from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.DeviceRouter import device_router
+from app.pkg_smart_strip.models.Heartbeat import heartbeat
+from app.pkg_smart_strip.models.Notifier import notifier
+from app.pkg_smart_strip.models.StateStore import state_store
+from app.pkg_smart_strip.models.UserRegistry import users_cache
+from app.pkg_spreadsheet.models.Spreadsheet import table
+from app.pkg_spreadsheet.models.SpreadsheetWriter import expense_writer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_client.start()
+    await device_router.start(devices_registry)
+    users_cache.restore(await state_store.load())
+    state_store.start()
+    users_cache.start_sweeper()
+    heartbeat.start()
+    notifier.start()
+    table.start_warm_up()
+    expense_writer.start()
+    yield
+    await expense_writer.stop()
+    await notifier.stop()
+    await heartbeat.stop()
+    await users_cache.stop_sweeper()
+    await state_store.stop()
+    await device_router.stop()
+    await http_client.stop()
 
 
-app = FastAPI(redoc_url=None, debug=True, docs_url=None)
+app = FastAPI(redoc_url=None, debug=True, docs_url=None, lifespan=lifespan)
 
 app.include_router(api_router)
 
@@ -19,6 +52,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+import os
+
+# Конфигурация читается при импорте приложения, поэтому окружение задается до него
+os.environ.setdefault("LOGIN", "login")
+os.environ.setdefault("PASSWORD", "password")
+os.environ.setdefault("API_KEY", "key")
+os.environ.setdefault("CLIENT_ID", "client_id")
+os.environ.setdefault("CLIENT_SECRET", "client_secret")
+os.environ.setdefault("FILE_GCP_SHEETS_KEY", "service_account.json")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["STATE_STORE_PATH"] = ""
@@ -0,0 +1,51 @@
+import pytest
+
+from app.pkg_smart_strip.models.Capabilities import (
+    ON_OFF, RANGE, MODE, COLOR_SETTING, apply_capability, query_capabilities
+)
+from app.pkg_smart_strip.models.Device import SmartStripDevice, DeviceMode
+
+
+def test_query_keeps_falsy_values():
+    device = SmartStripDevice("device")
+    device.state.on = False
+    device.state.brightness = 0
+
+    values = {cap["state"]["instance"]: cap["state"]["value"] for cap in query_capabilities(device)}
+
+    assert values == {"on": False, "brightness": 0, "program": "one", "hsv": {"h": 240, "s": 100, "v": 100}}
+
+
+@pytest.mark.parametrize("cap_type, instance, value", [
+    (ON_OFF, "on", "yes"),
+    (RANGE, "brightness", 101),
+    (RANGE, "brightness", -1),
+    (RANGE, "brightness", True),
+    (MODE, "program", "six"),
+    (COLOR_SETTING, "hsv", {"h": 400, "s": 200, "v": -1}),
+    (COLOR_SETTING, "hsv", {"h": 361, "s": 50, "v": 50}),
+    (COLOR_SETTING, "hsv", {"h": 10, "s": 50}),
+])
+def test_invalid_values_are_not_applied(cap_type, instance, value):
+    device = SmartStripDevice("device")
+    before = device.state_dict()
+
+    status, error_code, _ = apply_capability(device, cap_type, instance, value)
+
+    assert (status, error_code) == ("ERROR", "INVALID_VALUE")
+    assert device.state_dict() == before
+
+
+def test_color_switches_to_color_program():
+    device = SmartStripDevice("device")
+
+    assert apply_capability(device, COLOR_SETTING, "hsv", {"h": 360, "s": 0, "v": 100}) == ("DONE", None, None)
+    assert device.state.hsv.h == 360
+    assert device.state.program == DeviceMode.five
+
+
+def test_unknown_capability():
+    device = SmartStripDevice("device")
+
+    status, error_code, _ = apply_capability(device, "devices.capabilities.toggle", "mute", True)
+    assert (status, error_code) == ("ERROR", "UNSUPPORTED_CAPABILITY")
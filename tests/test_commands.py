@@ -0,0 +1,49 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from app.general.utils.config import app_config
+
+HEADERS = {"X-API-Key": app_config.api_key}
+
+
+def _post(path: str, **kwargs) -> httpx.Response:
+    async def request():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="https://test") as client:
+            return await client.post(path, headers=HEADERS, **kwargs)
+
+    return asyncio.run(request())
+
+
+@pytest.mark.parametrize("value", [-1, 101, 150])
+def test_out_of_range_brightness_is_rejected(value):
+    response = _post("/smart-strip/v1.0/brightness", params={"device_id": "missing", "new_brightness": value})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("color", [{"h": 400, "s": 50, "v": 50}, {"h": 10, "s": 200, "v": 50}, {"h": 10, "s": 50, "v": -1}])
+def test_out_of_range_color_is_rejected(color):
+    response = _post("/smart-strip/v1.0/color", params={"device_id": "missing"}, json=color)
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/smart-strip/v1.0/program", {"new_program": "six"}),
+    ("/smart-strip/v1.0/state", {"new_state": "maybe"})
+])
+def test_invalid_values_are_rejected(path, params):
+    response = _post(path, params={"device_id": "missing", **params})
+    assert response.status_code == 422
+
+
+def test_bulk_rejects_out_of_range_state():
+    response = _post("/smart-strip/v1.0/bulk", json={"all": True, "state": {"brightness": 150}})
+    assert response.status_code == 422
+
+
+def test_valid_brightness_for_unknown_device():
+    response = _post("/smart-strip/v1.0/brightness", params={"device_id": "missing", "new_brightness": 100})
+    assert response.json() == {"msg": "Device with device_id = missing unavailable"}
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from app.pkg_smart_strip.api.user_devices import get_remote_discovery, remote_discovery
+from app.pkg_smart_strip.models.Device import SmartStripDevice, SMART_STRIP_CAPABILITIES
+
+
+def test_first_frame_is_full_then_deltas():
+    device = SmartStripDevice("device")
+
+    frame = device.build_state_frame()
+    assert frame == {"seq": 1, "full": device.state_dict()}
+    device.confirm_state_frame(frame)
+
+    assert device.build_state_frame() is None
+
+    device.state.brightness = 40
+    frame = device.build_state_frame()
+    assert frame == {"seq": 2, "delta": {"brightness": 40}}
+
+
+def test_resync_during_delta_send():
+    device = SmartStripDevice("device")
+    device.confirm_state_frame(device.build_state_frame())
+
+    device.state.brightness = 40
+    in_flight = device.build_state_frame()
+    # Запрос ленты пришел, пока кадр с дельтой отправлялся
+    device.reset_state_sync()
+    device.confirm_state_frame(in_flight)
+
+    assert device.build_state_frame() == {"seq": 3, "full": device.state_dict()}
+
+
+def test_resync_without_changes_sends_full_frame():
+    device = SmartStripDevice("device")
+    device.confirm_state_frame(device.build_state_frame())
+
+    device.reset_state_sync()
+    frame = device.build_state_frame()
+    assert frame == {"seq": 2, "full": device.state_dict()}
+
+    device.confirm_state_frame(frame)
+    assert device.build_state_frame() is None
+
+
+def test_shared_descriptors_are_read_only():
+    brightness, mode = SMART_STRIP_CAPABILITIES[1], SMART_STRIP_CAPABILITIES[2]
+
+    with pytest.raises(TypeError):
+        brightness.parameters["instance"] = "volume"
+    with pytest.raises(TypeError):
+        brightness.parameters["range"]["max"] = 1000
+    with pytest.raises(AttributeError):
+        mode.parameters["modes"].append({"value": "six"})
+
+    shared = zip(SmartStripDevice("a").capabilities, SmartStripDevice("b").capabilities, SMART_STRIP_CAPABILITIES)
+    assert all(a is b is c for a, b, c in shared)
+
+
+def test_discovery_json_serializes_frozen_parameters():
+    capabilities = json.loads(SmartStripDevice("device").discovery_json())["capabilities"]
+
+    assert capabilities[1]["parameters"]["range"] == {"min": 0, "max": 100, "precision": 1}
+    assert capabilities[2]["parameters"]["modes"] == [
+        {"value": mode} for mode in ("one", "two", "three", "four", "five")
+    ]
+
+
+def test_remote_discovery_keeps_only_listed_strips():
+    first = get_remote_discovery(["remote-a", "remote-b"])
+    assert [json.loads(fragment)["id"] for fragment in first] == ["remote-a", "remote-b"]
+
+    second = get_remote_discovery(["remote-b", "remote-c"])
+    assert second[0] is first[1]
+    assert set(remote_discovery) == {"remote-b", "remote-c"}
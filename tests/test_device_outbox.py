@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+from app.pkg_smart_strip.models.Device import SmartStripDevice
+from app.pkg_smart_strip.models.DeviceOutbox import DeviceOutbox
+from app.pkg_smart_strip.models.WireFormat import WireFormat
+
+
+class FakeConnection:
+    def __init__(self):
+        self.sent: list[str | bytes] = []
+        self.closed = False
+        # Пока событие не установлено, отправка висит
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_text(self, data: str):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def send_bytes(self, data: bytes):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def close(self):
+        self.closed = True
+
+
+def _outbox(wire_format: str = WireFormat.JSON_DELTA) -> tuple[SmartStripDevice, DeviceOutbox, list]:
+    device = SmartStripDevice("device", wire_format=wire_format)
+    device.connection = FakeConnection()
+    removed = []
+    outbox = DeviceOutbox(device, on_unhealthy=removed.append)
+    device.attach_outbox(outbox)
+    return device, outbox, removed
+
+
+def test_encoding_error_fails_waiters_and_stops_writer():
+    async def scenario():
+        device, outbox, removed = _outbox(WireFormat.BINARY)
+        # Значение, которое не помещается в бинарный кадр
+        device.state.brightness = 300
+
+        result = await asyncio.wait_for(outbox.push_state(), 1)
+        await asyncio.sleep(0)
+
+        assert result is False
+        assert not outbox.healthy
+        assert outbox._task is None
+        assert removed == [device]
+        assert await outbox.push_state() is False
+
+    asyncio.run(scenario())
+
+
+def test_resync_while_delta_is_in_flight():
+    async def scenario():
+        device, outbox, _ = _outbox()
+        connection = device.connection
+
+        assert await outbox.push_state()
+
+        connection.gate.clear()
+        device.state.brightness = 40
+        in_flight = outbox.push_state()
+        await asyncio.sleep(0)
+
+        device.reset_state_sync()
+        connection.gate.set()
+        assert await asyncio.wait_for(in_flight, 1)
+
+        assert await asyncio.wait_for(outbox.push_state(), 1)
+        assert outbox.healthy
+        assert [json.loads(frame) for frame in connection.sent] == [
+            {"seq": 1, "full": {**device.state_dict(), "brightness": 100}},
+            {"seq": 2, "delta": {"brightness": 40}},
+            {"seq": 3, "full": device.state_dict()}
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_legacy_frames_are_bare_state():
+    async def scenario():
+        device, outbox, _ = _outbox(WireFormat.JSON)
+
+        assert await outbox.push_state()
+        device.state.on = False
+        assert await outbox.push_state()
+
+        assert [json.loads(frame) for frame in device.connection.sent] == [
+            {**device.state_dict(), "on": True},
+            device.state_dict()
+        ]
+
+    asyncio.run(scenario())
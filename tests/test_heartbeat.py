@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from app.pkg_smart_strip.models.Device import SmartStripDevice
+from app.pkg_smart_strip.models.DeviceRegistry import DeviceRegistry
+from app.pkg_smart_strip.models.Heartbeat import HeartbeatScheduler, PING_JSON
+from app.pkg_smart_strip.models.WireFormat import WireFormat
+from tests.test_device_outbox import FakeConnection
+
+
+def _registry() -> DeviceRegistry:
+    registry = DeviceRegistry()
+    registry.devices = dict()
+    registry.groups = dict()
+    registry.discovery = dict()
+    return registry
+
+
+def _connect(registry: DeviceRegistry, device_id: str, heartbeat: bool) -> SmartStripDevice:
+    device = SmartStripDevice(device_id, wire_format=WireFormat.JSON_DELTA, heartbeat=heartbeat)
+    device.connection = FakeConnection()
+    registry.add_device(device)
+    return device
+
+
+def test_only_opted_in_strips_are_pinged_and_reaped():
+    async def scenario():
+        registry = _registry()
+        scheduler = HeartbeatScheduler(registry, interval=0.05, timeout=0.2)
+        scheduler.start()
+
+        legacy = _connect(registry, "legacy", heartbeat=False)
+        watched = _connect(registry, "watched", heartbeat=True)
+        scheduler.watch(legacy)
+        scheduler.watch(watched)
+
+        await asyncio.sleep(0.1)
+        assert watched.connection.sent == [PING_JSON]
+        assert legacy.connection.sent == []
+
+        await asyncio.sleep(0.25)
+        await scheduler.stop()
+
+        assert registry.get_device_by_id("watched") is None
+        assert watched.connection.closed
+        assert registry.get_device_by_id("legacy") is legacy
+        assert not legacy.connection.closed
+
+    asyncio.run(scenario())
+
+
+def test_silent_strip_without_heartbeat_is_not_stale():
+    scheduler = HeartbeatScheduler(_registry(), interval=1, timeout=2)
+    legacy = SmartStripDevice("legacy")
+    watched = SmartStripDevice("watched", heartbeat=True)
+
+    for device in (legacy, watched):
+        device._last_seen = time.monotonic() - 10
+
+    assert not scheduler.is_stale(legacy)
+    assert scheduler.is_stale(watched)
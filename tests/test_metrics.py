@@ -0,0 +1,39 @@
+import asyncio
+
+from app.general.utils.metrics import metrics
+from app.pkg_smart_strip.models.Device import SmartStripDevice
+from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+
+
+def _series(device_id: str) -> list[str]:
+    return [line for line in metrics.render().splitlines() if f'device_id="{device_id}"' in line]
+
+
+def test_device_series_are_removed_on_disconnect():
+    async def scenario():
+        device = SmartStripDevice("metrics-strip")
+        devices_registry.add_device(device)
+        device.outbox._send_failures.inc()
+        assert _series("metrics-strip")
+
+        devices_registry.remove_device(device)
+        assert _series("metrics-strip") == []
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_keeps_series_of_new_connection():
+    async def scenario():
+        old, new = SmartStripDevice("reconnect-strip"), SmartStripDevice("reconnect-strip")
+        devices_registry.add_device(old)
+        devices_registry.add_device(new)
+        new.outbox._send_failures.inc()
+
+        # Запоздавшее отключение старого сокета не трогает серии нового
+        devices_registry.remove_device(old)
+        assert 'smartstrip_ws_send_failures_total{device_id="reconnect-strip"} 1' in _series("reconnect-strip")
+
+        devices_registry.remove_device(new)
+        assert _series("reconnect-strip") == []
+
+    asyncio.run(scenario())
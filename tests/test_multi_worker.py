@@ -0,0 +1,136 @@
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+websockets_client = pytest.importorskip("websockets.sync.client")
+
+ROOT = Path(__file__).resolve().parent.parent
+API_KEY = "multi-worker-key"
+# Воркеры стоят за прокси с TLS, как в проде: HTTPSRedirectMiddleware смотрит на X-Forwarded-Proto
+PROXY_HEADERS = {"X-Forwarded-Proto": "https"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _accepts_connections(port: int) -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+def _wait_for(condition, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.05)
+    raise TimeoutError("Condition was not met in time")
+
+
+@pytest.fixture
+def workers(tmp_path):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "API_KEY": API_KEY,
+        "LOGIN": "login",
+        "PASSWORD": "password",
+        "DEVICE_ROUTER": "unix",
+        "DEVICE_ROUTER_DIR": str(tmp_path),
+        "STATE_STORE_PATH": "",
+        "LOG_LEVEL": "WARNING",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--workers", "2", "--host", "127.0.0.1", "--port", str(port),
+         "--proxy-headers", "--forwarded-allow-ips", "*", "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+
+    try:
+        # Каждый воркер при старте открывает свой сокет маршрутизатора
+        _wait_for(lambda: len(list((tmp_path / "workers").glob("*.sock"))) == 2)
+        _wait_for(lambda: _accepts_connections(port))
+        yield port, tmp_path
+    finally:
+        process.terminate()
+        process.wait(timeout=20)
+
+
+def _connected_devices(client: httpx.Client) -> int:
+    response = client.get("/metrics", auth=("login", "password"))
+    return int(re.search(r"^smartstrip_connected_devices (\d+)", response.text, re.M).group(1))
+
+
+# Соединение httpx.Client с одним keep-alive подключением обслуживает один и тот же воркер
+def _client_of_other_worker(port: int) -> httpx.Client:
+    for _ in range(100):
+        client = httpx.Client(base_url=f"http://127.0.0.1:{port}", headers=PROXY_HEADERS,
+                              limits=httpx.Limits(max_connections=1))
+        if _connected_devices(client) == 0:
+            return client
+        client.close()
+    pytest.fail("Every connection landed on the worker that owns the strip")
+
+
+def test_action_through_other_worker_reaches_strip(workers):
+    port, run_dir = workers
+    url = f"ws://127.0.0.1:{port}/smart-strip/v1.0/websocket/mw-strip?proto=2"
+
+    with websockets_client.connect(url, additional_headers={"X-API-Key": API_KEY, **PROXY_HEADERS}) as strip:
+        owner_file = run_dir / "owners" / "mw-strip"
+        _wait_for(owner_file.exists)
+
+        client = _client_of_other_worker(port)
+        try:
+            response = client.post("/smart-strip/v1.0/brightness", headers={"X-API-Key": API_KEY},
+                                   params={"device_id": "mw-strip", "new_brightness": 40})
+            assert response.json() == {"msg": "Device state updated"}
+
+            frame = json.loads(strip.recv(timeout=10))
+            assert frame["seq"] == 1
+            assert frame["full"]["brightness"] == 40
+
+            # Чтение состояния тоже идет через воркер-владелец
+            response = client.get("/smart-strip/v1.0/brightness", headers={"X-API-Key": API_KEY},
+                                  params={"device_id": "mw-strip"})
+            assert response.json() == 40
+        finally:
+            client.close()
+
+
+def test_group_command_through_other_worker_reaches_strip(workers):
+    port, run_dir = workers
+    url = f"ws://127.0.0.1:{port}/smart-strip/v1.0/websocket/mw-kitchen?proto=2&groups=kitchen"
+
+    with websockets_client.connect(url, additional_headers={"X-API-Key": API_KEY, **PROXY_HEADERS}) as strip:
+        _wait_for((run_dir / "owners" / "mw-kitchen").exists)
+
+        client = _client_of_other_worker(port)
+        try:
+            response = client.post("/smart-strip/v1.0/bulk", headers={"X-API-Key": API_KEY},
+                                   json={"group": "kitchen", "state": {"brightness": 25}, "wait": True})
+            assert response.json() == {"devices": [{"id": "mw-kitchen", "status": "DONE"}]}
+
+            frame = json.loads(strip.recv(timeout=10))
+            assert frame["full"]["brightness"] == 25
+
+            # Лента не входит в другие группы
+            response = client.post("/smart-strip/v1.0/bulk", headers={"X-API-Key": API_KEY},
+                                   json={"group": "hall", "state": {"brightness": 30}})
+            assert response.json() == {"devices": []}
+        finally:
+            client.close()
@@ -0,0 +1,26 @@
+from app.general.utils.metrics import metrics
+from app.general.utils.negative_cache import NegativeCache
+from app.general.utils.verification import rejected_tokens
+
+
+def test_overflow_evicts_oldest_tokens():
+    cache = NegativeCache(ttl=60, max_size=2)
+    for token in ("a", "b", "c"):
+        cache.add(token)
+
+    assert not cache.contains("a")
+    assert cache.contains("c")
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 1, "evictions": 1}
+
+
+def test_evictions_are_exported():
+    evictions = rejected_tokens.evictions
+    size = rejected_tokens.max_size
+    rejected_tokens.max_size = len(rejected_tokens)
+    try:
+        rejected_tokens.add("evicted")
+    finally:
+        rejected_tokens.max_size = size
+        rejected_tokens.discard("evicted")
+
+    assert f"smartstrip_rejected_tokens_evictions_total {evictions + 1}" in metrics.render()
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from benchmarks.stubs import create_yandex_stub
+from app.general.utils.http_client import http_client
+from app.pkg_smart_strip.models.DeviceRegistry import devices_registry
+from app.pkg_smart_strip.models.Notifier import CallbackNotifier
+from app.pkg_smart_strip.models.UserRegistry import users_cache
+
+CALLBACK_URL = "http://yandex/api/v1/skills/{skill_id}/callback/state"
+DEVICE_IDS = [f"notify-{i}" for i in range(5)]
+
+
+@pytest.fixture
+def yandex_stub():
+    stub = create_yandex_stub()
+    previous = http_client._client
+    # Колбэки уходят в заглушку Яндекса
+    http_client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    users_cache.init_test_user()
+    for device_id in DEVICE_IDS:
+        devices_registry.init_test_device(device_id)
+    yield stub
+    for device_id in DEVICE_IDS:
+        devices_registry.remove_device_by_id(device_id)
+    users_cache.remove_user_by_id("000000000")
+    asyncio.run(http_client._client.aclose())
+    http_client._client = previous
+
+
+def _notifier(**kwargs) -> CallbackNotifier:
+    return CallbackNotifier(skill_id="skill", token="skill-token", url=CALLBACK_URL, **kwargs)
+
+
+def _callback_devices(stub) -> list[list[str]]:
+    return [[device["id"] for device in body["payload"]["devices"]] for _, body in stub.state.callback_log]
+
+
+def test_burst_of_changes_is_sent_as_one_callback(yandex_stub):
+    async def scenario():
+        notifier = _notifier(debounce=0.05, max_delay=5)
+        notifier.start()
+
+        for device_id in DEVICE_IDS * 3:
+            notifier.device_changed(device_id)
+            await asyncio.sleep(0.005)
+        assert yandex_stub.state.callback_requests == 0
+
+        await asyncio.sleep(0.3)
+        await notifier.stop()
+
+    asyncio.run(scenario())
+
+    assert yandex_stub.state.callback_requests == 1
+    assert sorted(_callback_devices(yandex_stub)[0]) == DEVICE_IDS
+
+
+def test_max_delay_caps_the_wait(yandex_stub):
+    async def scenario() -> float:
+        notifier = _notifier(debounce=0.2, max_delay=0.3)
+        notifier.start()
+        started = time.monotonic()
+
+        # Изменения идут чаще паузы debounce, поэтому отправку ограничивает только max_delay
+        while time.monotonic() - started < 1.0:
+            notifier.device_changed(DEVICE_IDS[0])
+            await asyncio.sleep(0.05)
+
+        await notifier.stop()
+        return started
+
+    started = asyncio.run(scenario())
+
+    first_sent_at = yandex_stub.state.callback_log[0][0]
+    assert 0.3 <= first_sent_at - started < 0.6
+    assert yandex_stub.state.callback_requests >= 3
+
+
+@pytest.mark.parametrize("statuses", [[500, 503], [429, 429], [502, 429]])
+def test_server_errors_and_429_are_retried_with_backoff(yandex_stub, statuses):
+    yandex_stub.state.callback_statuses = list(statuses)
+
+    async def scenario():
+        notifier = _notifier(debounce=0.01, max_delay=1, retries=3, backoff=0.05)
+        notifier.device_changed(DEVICE_IDS[0])
+        # stop отправляет накопленное сразу и дожидается окончания повторов
+        await notifier.stop()
+
+    asyncio.run(scenario())
+
+    sent_at = [at for at, _ in yandex_stub.state.callback_log]
+    assert yandex_stub.state.callback_requests == 3
+    assert yandex_stub.state.callback_devices == 1
+    assert sent_at[1] - sent_at[0] >= 0.05
+    assert sent_at[2] - sent_at[1] >= 0.1
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404])
+def test_other_client_errors_are_not_retried(yandex_stub, status):
+    yandex_stub.state.callback_statuses = [status]
+
+    async def scenario():
+        notifier = _notifier(debounce=0.01, max_delay=1, retries=3, backoff=0.01)
+        notifier.device_changed(DEVICE_IDS[0])
+        await notifier.stop()
+
+    asyncio.run(scenario())
+
+    assert yandex_stub.state.callback_requests == 1
+    assert yandex_stub.state.callback_devices == 0
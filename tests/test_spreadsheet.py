@@ -0,0 +1,106 @@
+import asyncio
+
+from benchmarks.stubs import install_fake_spreadsheet
+from app.pkg_spreadsheet.models.Spreadsheet import Spreadsheet
+from app.pkg_spreadsheet.models.SpreadsheetWriter import SpreadsheetWriter, WriteStatus
+
+TITLES = ["date", "sum", "category"]
+
+
+def _spreadsheet():
+    spreadsheet = Spreadsheet()
+    fake = install_fake_spreadsheet(spreadsheet, {"budget": TITLES})
+    return spreadsheet, fake, fake.sheets["budget"]
+
+
+def test_append_rows_is_one_request():
+    spreadsheet, fake, worksheet = _spreadsheet()
+
+    spreadsheet.append_rows("budget", [{"date": "01.01", "sum": i} for i in range(10)])
+
+    assert worksheet.calls == {"row_values": 1, "append_rows": 1}
+    assert fake.worksheet_calls == 1
+    assert worksheet.rows[1:] == [["01.01", str(i), ""] for i in range(10)]
+
+
+def test_titles_and_worksheet_are_cached_between_appends():
+    spreadsheet, fake, worksheet = _spreadsheet()
+
+    for i in range(5):
+        spreadsheet.append_row("budget", {"sum": i, "category": "food"})
+
+    assert worksheet.calls == {"row_values": 1, "append_rows": 5}
+    assert fake.worksheet_calls == 1
+
+
+def test_unknown_field_reloads_titles():
+    spreadsheet, fake, worksheet = _spreadsheet()
+
+    spreadsheet.append_row("budget", {"sum": 1})
+    worksheet.rows[0].append("comment")
+    spreadsheet.append_row("budget", {"sum": 2, "comment": "new column"})
+
+    assert worksheet.calls["row_values"] == 2
+    assert worksheet.rows[-1] == ["", "2", "", "new column"]
+
+
+def test_writer_batch_is_one_round_trip():
+    spreadsheet, fake, worksheet = _spreadsheet()
+
+    async def scenario():
+        writer = SpreadsheetWriter(spreadsheet, batch_size=50, flush_interval=0.05)
+        writer.start()
+        ids = [writer.submit("budget", {"sum": i}) for i in range(20)]
+        await writer.stop()
+        return [writer.get_status(request_id)["status"] for request_id in ids]
+
+    statuses = asyncio.run(scenario())
+
+    assert statuses == [WriteStatus.DONE] * 20
+    assert worksheet.append_calls == 1
+    assert "col_values" not in worksheet.calls
+
+
+def test_rows_queued_during_shutdown_are_written():
+    spreadsheet = Spreadsheet()
+    fake = install_fake_spreadsheet(spreadsheet, {"budget": TITLES}, latency=0.05)
+    worksheet = fake.sheets["budget"]
+
+    async def scenario():
+        writer = SpreadsheetWriter(spreadsheet, batch_size=5, flush_interval=0.01)
+        writer.start()
+        ids = [writer.submit("budget", {"sum": i}) for i in range(12)]
+
+        stopping = asyncio.create_task(writer.stop())
+        await asyncio.sleep(0)
+        # Записи после сигнала остановки дописываются после завершения обработчика
+        ids += [writer.submit("budget", {"sum": i}) for i in range(12, 15)]
+        await stopping
+        return [writer.get_status(request_id)["status"] for request_id in ids]
+
+    statuses = asyncio.run(scenario())
+
+    assert statuses == [WriteStatus.DONE] * 15
+    assert [row[1] for row in worksheet.rows[1:]] == [str(i) for i in range(15)]
+
+
+def test_stop_does_not_hang_when_worker_died_with_full_queue():
+    spreadsheet, fake, worksheet = _spreadsheet()
+
+    async def broken_collect():
+        raise RuntimeError("worker crashed")
+
+    async def scenario():
+        writer = SpreadsheetWriter(spreadsheet, max_queue_size=2)
+        writer._collect = broken_collect
+        writer.start()
+        await asyncio.sleep(0)
+
+        ids = [writer.submit("budget", {"sum": i}) for i in range(2)]
+        await asyncio.wait_for(writer.stop(), 1)
+        return [writer.get_status(request_id)["status"] for request_id in ids]
+
+    statuses = asyncio.run(scenario())
+
+    assert statuses == [WriteStatus.DONE] * 2
+    assert worksheet.append_calls == 1
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from benchmarks.stubs import create_yandex_stub
+from app.general.utils.http_client import http_client
+from app.general.utils.verification import rejected_tokens
+from app.pkg_smart_strip.models.User import User
+from app.pkg_smart_strip.models.UserRegistry import users_cache
+
+import main
+
+DEVICES_URL = "/smart-strip/v1.0/user/devices"
+
+
+@pytest.fixture
+def yandex_stub():
+    stub = create_yandex_stub(latency=0.05)
+    previous = http_client._client
+    # Все исходящие запросы приложения уходят в заглушку Яндекса
+    http_client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    yield stub
+    asyncio.run(http_client._client.aclose())
+    http_client._client = previous
+    for user_id in users_cache.get_users():
+        users_cache.remove_user_by_id(user_id)
+    rejected_tokens.clear()
+
+
+async def _get_devices(token: str, count: int) -> list[httpx.Response]:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="https://test") as client:
+        return await asyncio.gather(*(
+            client.get(DEVICES_URL, headers={"Authorization": f"Bearer {token}", "X-Request-Id": str(i)})
+            for i in range(count)
+        ))
+
+
+def _add_expired_user(user_id: str, token: str, refresh_token: str | None = None):
+    users_cache.add_user(User(
+        user_id=user_id,
+        access_token=token,
+        refresh_token=refresh_token,
+        expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+    ))
+
+
+def test_parallel_requests_share_one_userinfo_call(yandex_stub):
+    responses = asyncio.run(_get_devices("bench-7", 500))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert yandex_stub.state.userinfo_requests == 1
+    assert users_cache.get_user_by_token("bench-7").user_id == "7"
+
+
+def test_rejected_token_is_checked_once(yandex_stub):
+    responses = asyncio.run(_get_devices("unknown", 50))
+
+    assert all(response.status_code == 401 for response in responses)
+    asyncio.run(_get_devices("unknown", 1))
+    assert yandex_stub.state.userinfo_requests == 1
+
+
+@pytest.mark.parametrize("status_code", [408, 429, 503])
+def test_transient_userinfo_errors_are_not_cached(yandex_stub, status_code):
+    yandex_stub.state.userinfo_status = status_code
+    assert asyncio.run(_get_devices("bench-3", 1))[0].status_code == 401
+
+    yandex_stub.state.userinfo_status = None
+    assert asyncio.run(_get_devices("bench-3", 1))[0].status_code == 200
+    assert yandex_stub.state.userinfo_requests == 2
+
+
+def test_expired_token_without_refresh_token_is_revalidated(yandex_stub):
+    _add_expired_user("9", "bench-9")
+
+    responses = asyncio.run(_get_devices("bench-9", 20))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert yandex_stub.state.token_requests == 0
+    assert yandex_stub.state.userinfo_requests == 1
+    assert users_cache.get_user_by_token("bench-9").is_token_valid()
+
+
+def test_expired_token_is_refreshed(yandex_stub):
+    _add_expired_user("5", "bench-old", "refresh-5")
+
+    responses = asyncio.run(_get_devices("bench-old", 20))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert yandex_stub.state.token_requests == 1
+    assert yandex_stub.state.userinfo_requests == 0
+    assert users_cache.get_user_by_id("5").access_token == "bench-5"
+
+
+def test_rejected_refresh_falls_back_to_userinfo(yandex_stub):
+    _add_expired_user("6", "bench-6", "revoked")
+
+    for _ in range(3):
+        assert asyncio.run(_get_devices("bench-6", 1))[0].status_code == 200
+
+    # Отказ в обновлении не оставляет пользователя в кеше: дальше токен берется из ответа userinfo
+    assert yandex_stub.state.token_requests == 1
+    assert yandex_stub.state.userinfo_requests == 1
+
+
+def test_unreachable_token_endpoint_falls_back_to_userinfo(yandex_stub):
+    _add_expired_user("8", "bench-8", "refresh-8")
+    stub_client = http_client._client
+
+    async def failing_token(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/token":
+            raise httpx.ConnectError("connection refused", request=request)
+        return await stub_client._transport.handle_async_request(request)
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(failing_token))
+    try:
+        responses = asyncio.run(_get_devices("bench-8", 5))
+    finally:
+        http_client._client = stub_client
+
+    assert all(response.status_code == 200 for response in responses)
+    assert yandex_stub.state.userinfo_requests == 1
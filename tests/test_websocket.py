@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.general.utils.config import app_config
+from app.pkg_smart_strip.models.WireFormat import FrameType, decode_frame, encode_header, encode_state
+
+HEADERS = {"X-API-Key": app_config.api_key}
+FULL_STATE = {"on": True, "brightness": 40, "program": "one", "hsv": {"h": 240, "s": 100, "v": 100}}
+
+
+# Очереди синглтонов приложения привязываются к циклу событий, поэтому lifespan один на модуль
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app, base_url="https://testserver") as client:
+        yield client
+
+
+def _connect(client: TestClient, device_id: str, query: str = ""):
+    return client.websocket_connect(f"wss://testserver/smart-strip/v1.0/websocket/{device_id}{query}", headers=HEADERS)
+
+
+def _set_brightness(client: TestClient, device_id: str, value: int):
+    return client.post("/smart-strip/v1.0/brightness", params={"device_id": device_id, "new_brightness": value},
+                       headers=HEADERS)
+
+
+def test_default_protocol_sends_bare_state(client):
+    with _connect(client, "legacy") as websocket:
+        _set_brightness(client, "legacy", 40)
+        assert websocket.receive_json() == FULL_STATE
+
+        _set_brightness(client, "legacy", 50)
+        assert websocket.receive_json() == {**FULL_STATE, "brightness": 50}
+
+
+def test_default_protocol_ignores_acks(client):
+    with _connect(client, "legacy-acks", "?acks=1") as websocket:
+        response = _set_brightness(client, "legacy-acks", 40)
+        assert response.json() == {"msg": "Device state updated"}
+        assert websocket.receive_json() == FULL_STATE
+        assert not main.devices_registry.get_device_by_id("legacy-acks").acks
+
+
+@pytest.mark.parametrize("query, subprotocols", [("?proto=2", None), ("", ["smartstrip.json.v2"])])
+def test_proto_2_sends_seq_and_deltas(client, query, subprotocols):
+    device_id = f"delta-{bool(query)}"
+    with client.websocket_connect(f"wss://testserver/smart-strip/v1.0/websocket/{device_id}{query}", headers=HEADERS,
+                                  subprotocols=subprotocols) as websocket:
+        _set_brightness(client, device_id, 40)
+        assert websocket.receive_json() == {"seq": 1, "full": FULL_STATE}
+
+        _set_brightness(client, device_id, 50)
+        assert websocket.receive_json() == {"seq": 2, "delta": {"brightness": 50}}
+
+        websocket.send_json({"type": "resync"})
+        assert websocket.receive_json() == {"seq": 3, "full": {**FULL_STATE, "brightness": 50}}
+
+
+def _report(websocket, seq: int, **state):
+    websocket.send_json({"type": "report", "seq": seq, "state": state})
+
+
+# Сообщения ленты обрабатываются по порядку, поэтому ответ на resync приходит уже после разобранных отчетов
+def _resync_state(websocket) -> dict:
+    websocket.send_json({"type": "resync"})
+    return websocket.receive_json()["full"]
+
+
+def test_report_with_repeated_or_lower_seq_is_ignored(client):
+    with _connect(client, "report-seq", "?proto=2") as websocket:
+        _report(websocket, 5, brightness=30)
+        _report(websocket, 5, brightness=60)
+        _report(websocket, 3, brightness=70)
+
+        assert _resync_state(websocket)["brightness"] == 30
+        assert main.devices_registry.get_device_by_id("report-seq").state.brightness == 30
+
+
+def test_invalid_report_is_dropped(client):
+    with _connect(client, "report-invalid", "?proto=2") as websocket:
+        _report(websocket, 1, brightness=500)
+        assert _resync_state(websocket)["brightness"] == 100
+
+        # Отброшенный отчет не занимает номер
+        _report(websocket, 1, brightness=20)
+        assert _resync_state(websocket)["brightness"] == 20
+
+
+def test_binary_report_updates_state(client):
+    with _connect(client, "report-binary", "?format=binary") as websocket:
+        report = {**FULL_STATE, "on": False, "brightness": 15, "hsv": {"h": 10, "s": 20, "v": 30}}
+        websocket.send_bytes(encode_state(FrameType.REPORT, 1, report))
+
+        websocket.send_bytes(encode_header(FrameType.RESYNC))
+        frame_type, _, state = decode_frame(websocket.receive_bytes())
+        assert frame_type == FrameType.STATE
+        assert state == report
+        assert main.devices_registry.get_device_by_id("report-binary").state.brightness == 15
+
+
+@pytest.mark.parametrize("device_id, query", [("acks-json", "?acks=1&proto=2"), ("acks-binary", "?acks=1&format=binary")])
+def test_command_resolves_only_after_ack(client, device_id, query):
+    async def push_state() -> asyncio.Future:
+        return main.devices_registry.update_device_state(device_id)
+
+    with _connect(client, device_id, query) as websocket:
+        device = main.devices_registry.get_device_by_id(device_id)
+        assert device.acks
+
+        future = client.portal.call(push_state)
+        if "proto" in query:
+            assert websocket.receive_json()["seq"] == 1
+        else:
+            assert decode_frame(websocket.receive_bytes())[:2] == (FrameType.STATE, 1)
+
+        # Кадр уже у ленты, но команда выполнена только после ее подтверждения
+        assert not future.done()
+        assert device.outbox.last_ack_rtt is None
+
+        websocket.send_json({"type": "ack", "seq": 1})
+        assert client.portal.call(asyncio.wait_for, future, 5) is True
+        assert device.outbox.last_ack_rtt is not None
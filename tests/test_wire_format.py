@@ -0,0 +1,50 @@
+import pytest
+from pydantic import ValidationError
+
+from app.pkg_smart_strip.models.Device import HSVColor, SmartStripState, DeviceMode
+from app.pkg_smart_strip.models.WireFormat import (
+    FrameType, HEADER, STATE_FRAME, encode_header, encode_state, decode_frame
+)
+
+
+@pytest.mark.parametrize("program", list(DeviceMode))
+@pytest.mark.parametrize("hsv", [(0, 0, 0), (360, 100, 100), (123, 45, 67)])
+def test_state_round_trip(program, hsv):
+    h, s, v = hsv
+    state = SmartStripState(on=False, brightness=37, program=program, hsv=HSVColor(h=h, s=s, v=v)).to_wire()
+
+    data = encode_state(FrameType.STATE, 2**32 - 1, state)
+
+    assert len(data) == STATE_FRAME.size
+    assert decode_frame(data) == (FrameType.STATE, 2**32 - 1, state)
+    assert decode_frame(memoryview(data)) == (FrameType.STATE, 2**32 - 1, state)
+
+
+def test_header_round_trip():
+    data = encode_header(FrameType.RESYNC, 7)
+
+    assert len(data) == HEADER.size
+    assert decode_frame(data) == (FrameType.RESYNC, 7, None)
+
+
+@pytest.mark.parametrize("field, value", [("h", 361), ("s", 101), ("v", -1)])
+def test_hsv_is_bounded(field, value):
+    hsv = {"h": 0, "s": 0, "v": 0, field: value}
+
+    with pytest.raises(ValidationError):
+        HSVColor(**hsv)
+
+    state = {**SmartStripState().to_wire(), "hsv": hsv}
+    with pytest.raises(ValueError):
+        encode_state(FrameType.STATE, 1, state)
+
+
+def test_out_of_range_brightness_is_not_encoded():
+    with pytest.raises(ValueError):
+        encode_state(FrameType.STATE, 1, {**SmartStripState().to_wire(), "brightness": 300})
+
+
+@pytest.mark.parametrize("data", [b"", b"\x01\x00", STATE_FRAME.pack(FrameType.STATE, 1, 1, 50, 99, 0, 0, 0)])
+def test_malformed_frames_are_rejected(data):
+    with pytest.raises(ValueError):
+        decode_frame(data)